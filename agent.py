@@ -1,26 +1,91 @@
-from typing import TypedDict, Annotated, Sequence, Literal
-from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, ToolMessage, SystemMessage
-from langgraph.graph import StateGraph, START, END
-from langgraph.prebuilt.tool_node import ToolNode
-from langgraph.checkpoint.memory import MemorySaver
-from langchain_openai import ChatOpenAI
+from typing import TypedDict, Annotated, Sequence, Literal, Optional
+from uuid import uuid4
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, ToolMessage, SystemMessage, RemoveMessage
+from langchain_core.runnables import RunnableLambda
 from tools.arithmetic_tool import ArithmeticTool
 from tools.vacation_tool import VacationTool
-from memory.neo4j_memory import Neo4jMemory
+from tools.executor import ParallelToolExecutor
+from tools.fast_path import FastPathRouter
+from memory.history import HistoryWindow
+from memory.recall import ConversationRecall, format_recalled
+from memory.sqlite_checkpointer import SQLiteCheckpointSaver
+from utils.llm_cache import InMemoryLLMCacheBackend, LLMResponseCache, SQLiteLLMCacheBackend
+from utils.metrics import metrics
+import asyncio
+import json
 import operator
 import os
+import threading
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def add_messages(existing: list, new: list):
-    return existing + new
+SYSTEM_PROMPT = """You are a friendly and helpful assistant that can help with arithmetic calculations and provide country information.
+
+You have access to two tools:
+1. arithmetic_calculator: For mathematical calculations and expressions, including one formula over many values in a single call
+2. vacation_finder: For getting country information (capital, currency, region)
+
+For simple greetings like "hello" or "hi", respond naturally and offer to help. For questions that require calculations or country information, use the appropriate tools. Be conversational and helpful."""
+
+# Per-call timeouts and concurrency caps for the tools node, keyed by tool name
+TOOL_TIMEOUTS = {"arithmetic_calculator": 5.0, "vacation_finder": 20.0}
+TOOL_CONCURRENCY = {"vacation_finder": 4}
+
+SUMMARY_PROMPT = """Condense the conversation below into a short summary that keeps facts, numbers and countries the user may refer back to. Reply with the summary only."""
+
+def add_messages(existing: list, new):
+    """
+    Merge new messages into the thread history in place instead of copying it.
+    Messages are keyed by id: a known id replaces the earlier copy, RemoveMessage
+    deletes it, and a SystemMessage replaces the single leading system prompt.
+    Applying the same update twice is a no-op, which matters because LangGraph
+    may apply a node's writes to a channel copy sharing this list when it
+    evaluates conditional edges.
+    """
+    if existing is None:
+        existing = []
+    if not isinstance(new, list):
+        new = [new]
+
+    positions = None
+    removed = set()
+    for message in new:
+        if isinstance(message, RemoveMessage):
+            removed.add(message.id)
+            continue
+
+        if isinstance(message, SystemMessage):
+            if existing and isinstance(existing[0], SystemMessage):
+                existing[0] = message
+            else:
+                existing.insert(0, message)
+                positions = None
+            continue
+
+        if message.id is None:
+            message.id = str(uuid4())
+        else:
+            if positions is None:
+                positions = {m.id: i for i, m in enumerate(existing)}
+            if message.id in positions:
+                existing[positions[message.id]] = message
+                continue
+
+        if positions is not None:
+            positions[message.id] = len(existing)
+        existing.append(message)
+
+    if removed:
+        existing[:] = [m for m in existing if m.id not in removed]
+    return existing
 
 class AgentState(TypedDict):
     messages: Annotated[list[BaseMessage], add_messages]
     user_id: str
     conversation_count: int
     last_tool_used: str
+    summary: str
 
 def should_continue(state: AgentState) -> Literal["tools", "__end__"]:
     messages = state['messages']
@@ -30,93 +95,487 @@ def should_continue(state: AgentState) -> Literal["tools", "__end__"]:
         return "tools"
     return "__end__"
 
-class VacationArithmeticAgent:
+def after_fast_path(state: AgentState) -> Literal["agent", "__end__"]:
+    # The router only appends a message when it answered the input itself
+    if isinstance(state['messages'][-1], AIMessage):
+        return "__end__"
+    return "agent"
+
+class ToolUsageLog:
+    """
+    Collects the tool calls of one turn from the graph's update events,
+    pairing each call's name and arguments with its result, status and
+    duration, in the form memory.store_conversation takes as tool_usages.
+    Answers the fast-path router served in place of a tool count as a call.
+    """
+
     def __init__(self):
-        self.llm = ChatOpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=os.getenv('OPENROUTER_API_KEY'),
-            model=os.getenv('OPENROUTER_MODEL', 'anthropic/claude-3-haiku'),
-            temperature=0.7,
-            default_headers={
-                "HTTP-Referer": "http://localhost:3000",
-                "X-Title": "LangGraph Vacation Arithmetic Agent"
-            }
-        )
+        self._calls = {}
+        self.usages = []
+
+    def observe(self, event: dict):
+        for update in event.values():
+            if not update or "messages" not in update:
+                continue
+            for message in update["messages"]:
+                if isinstance(message, AIMessage):
+                    self._calls.update((call["id"], call) for call in message.tool_calls)
+                    routed = message.response_metadata.get("fast_path", {})
+                    if routed.get("tool_name"):
+                        self.usages.append({
+                            "tool_name": routed["tool_name"],
+                            "input_data": json.dumps(routed.get("tool_input", {}), sort_keys=True, default=str),
+                            "output_data": message.content,
+                            "duration": routed.get("duration"),
+                            "status": "success",
+                        })
+                elif isinstance(message, ToolMessage):
+                    call = self._calls.pop(message.tool_call_id, {})
+                    self.usages.append({
+                        "tool_name": message.name or call.get("name", "unknown"),
+                        "input_data": json.dumps(call.get("args", {}), sort_keys=True, default=str),
+                        "output_data": message.content if isinstance(message.content, str) else str(message.content),
+                        "duration": message.response_metadata.get("duration"),
+                        "status": message.status,
+                    })
+
+class VacationArithmeticAgent:
+    def __init__(self, max_history_messages: Optional[int] = 40, max_history_tokens: Optional[int] = None,
+                 summarize_history: bool = False, checkpointer=None, max_tool_workers: int = 8,
+                 fast_path: bool = True, llm_cache: Optional[LLMResponseCache] = None,
+                 llm=None, neo4j_memory=None, recall: Optional[ConversationRecall] = None,
+                 recall_k: int = 3):
+        # llm and neo4j_memory can be injected, e.g. fakes for benchmarks.
+        # The model client and the compiled graph pull in the heaviest imports,
+        # so they are built on first use rather than here.
+        self._llm = llm
+        self._llm_with_tools = None
+        self._graph = None
+        self._init_lock = threading.Lock()
 
         self.tools = [ArithmeticTool(), VacationTool()]
-        self.tool_node = ToolNode(self.tools)
-        self.llm_with_tools = self.llm.bind_tools(self.tools)
-        self.memory = MemorySaver()
-        self.neo4j_memory = Neo4jMemory()
-        self.graph = self._create_graph()
+        self.tool_node = ParallelToolExecutor(self.tools, max_workers=max_tool_workers,
+                                              concurrency_limits=TOOL_CONCURRENCY, timeouts=TOOL_TIMEOUTS)
+        self.llm_cache = llm_cache if llm_cache is not None else self._default_llm_cache()
+        self.fast_path = FastPathRouter(*self.tools) if fast_path else None
+        self.history_window = HistoryWindow(max_history_messages, max_history_tokens)
+        self.summarize_history = summarize_history
+        self.memory = checkpointer if checkpointer is not None else self._default_checkpointer()
+        self.neo4j_memory = neo4j_memory if neo4j_memory is not None else self._default_memory()
+        # Relevant past exchanges are recalled into the prompt, so the live history can stay short
+        self.recall = recall if recall is not None else self._default_recall()
+        self.recall_k = int(os.getenv('MEMORY_RECALL_TOP_K', recall_k))
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            with self._init_lock:
+                if self._llm is None:
+                    from langchain_openai import ChatOpenAI
+                    self._llm = ChatOpenAI(
+                        base_url="https://openrouter.ai/api/v1",
+                        api_key=os.getenv('OPENROUTER_API_KEY'),
+                        model=os.getenv('OPENROUTER_MODEL', 'anthropic/claude-3-haiku'),
+                        temperature=float(os.getenv('OPENROUTER_TEMPERATURE', '0.7')),
+                        default_headers={
+                            "HTTP-Referer": "http://localhost:3000",
+                            "X-Title": "LangGraph Vacation Arithmetic Agent"
+                        }
+                    )
+        return self._llm
+
+    @property
+    def llm_with_tools(self):
+        if self._llm_with_tools is None:
+            llm = self.llm
+            with self._init_lock:
+                if self._llm_with_tools is None:
+                    self._llm_with_tools = llm.bind_tools(self.tools)
+        return self._llm_with_tools
+
+    @property
+    def summary_llm(self):
+        # Runs inside the agent node; the nostream tag keeps its tokens out of stream_response
+        return self.llm.with_config(tags=["nostream"])
+
+    @property
+    def graph(self):
+        if self._graph is None:
+            with self._init_lock:
+                if self._graph is None:
+                    self._graph = self._create_graph()
+        return self._graph
+
+    def warm_up(self):
+        """Build the model client and graph now instead of on the first turn."""
+        with metrics.timer("startup", phase="warm_up"):
+            self.llm_with_tools
+            self.graph
+
+    @staticmethod
+    def _default_checkpointer():
+        path = os.getenv('CHECKPOINT_DB_PATH', 'checkpoints.sqlite')
+        if path == ':memory:':
+            from langgraph.checkpoint.memory import MemorySaver
+            return MemorySaver()
+        ttl = os.getenv('CHECKPOINT_TTL_SECONDS')
+        return SQLiteCheckpointSaver(path, ttl_seconds=float(ttl) if ttl else None)
+
+    @staticmethod
+    def _default_memory():
+        from memory.neo4j_memory import Neo4jMemory
+        from memory.resilient_memory import ResilientMemory
+        from memory.sqlite_memory import SQLiteMemory
+
+        backend = os.getenv('MEMORY_BACKEND', 'neo4j').lower()
+        if backend == 'sqlite':
+            return SQLiteMemory(os.getenv('MEMORY_SQLITE_PATH', 'memory.sqlite'))
+        if backend != 'neo4j':
+            raise ValueError(f"Unknown MEMORY_BACKEND {backend!r}, expected 'neo4j' or 'sqlite'")
+        spool_path = os.getenv('MEMORY_SPOOL_PATH', 'memory_spool.sqlite')
+        if not spool_path:
+            return Neo4jMemory()
+        return ResilientMemory(Neo4jMemory(), SQLiteMemory(spool_path),
+                               retry_interval=float(os.getenv('NEO4J_RETRY_INTERVAL', 30.0)))
+
+    @staticmethod
+    def _default_recall() -> Optional[ConversationRecall]:
+        if os.getenv('MEMORY_RECALL', 'false').lower() != 'true':
+            return None
+        path = os.getenv('MEMORY_RECALL_PATH', 'recall.sqlite')
+        return ConversationRecall(path=None if path == ':memory:' else path)
+
+    @staticmethod
+    def _default_llm_cache() -> Optional[LLMResponseCache]:
+        backend = os.getenv('LLM_CACHE', '').lower()
+        max_entries = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '10000'))
+        if backend == 'memory':
+            store = InMemoryLLMCacheBackend(maxsize=max_entries)
+        elif backend == 'sqlite':
+            store = SQLiteLLMCacheBackend(os.getenv('LLM_CACHE_PATH', 'llm_cache.sqlite'), maxsize=max_entries)
+        else:
+            return None
+        return LLMResponseCache(store, ttl=float(os.getenv('LLM_CACHE_TTL_SECONDS', str(24 * 60 * 60))),
+                                max_temperature=float(os.getenv('LLM_CACHE_MAX_TEMPERATURE', '0.0')))
 
     def _create_graph(self):
+        from langgraph.graph import StateGraph, START
+
         workflow = StateGraph(AgentState)
-        workflow.add_node("agent", self._call_model)
-        workflow.add_node("tools", self.tool_node)
-        workflow.add_edge(START, "agent")
+        workflow.add_node("agent", RunnableLambda(self._call_model, afunc=self._acall_model))
+        workflow.add_node("tools", RunnableLambda(self.tool_node.invoke, afunc=self.tool_node.ainvoke))
+        if self.fast_path is not None:
+            workflow.add_node("router", self._route_fast_path)
+            workflow.add_edge(START, "router")
+            workflow.add_conditional_edges("router", after_fast_path)
+        else:
+            workflow.add_edge(START, "agent")
         workflow.add_conditional_edges("agent", should_continue)
         workflow.add_edge("tools", "agent")
         return workflow.compile(checkpointer=self.memory)
 
+    @metrics.timed("graph_node", node="router")
+    def _route_fast_path(self, state: AgentState):
+        message = state["messages"][-1]
+        routed = self.fast_path.route(message.content) if isinstance(message.content, str) else None
+        if routed is None:
+            return {}
+
+        # The tool the route stands in for travels with the answer, so ToolUsageLog records it
+        fast_path = {"route": routed.route}
+        if routed.tool_name:
+            fast_path.update(tool_name=routed.tool_name, tool_input=routed.tool_input, duration=routed.duration)
+        return {
+            "messages": [AIMessage(content=routed.answer, response_metadata={"fast_path": fast_path})],
+            "conversation_count": state.get("conversation_count", 0) + 1,
+            "last_tool_used": routed.tool_name or "none"
+        }
+
+    @metrics.timed("graph_node", node="agent")
     def _call_model(self, state: AgentState):
+        kept, evicted = self.history_window.split(state["messages"])
+        summary = state.get("summary", "")
+        if evicted and self.summarize_history:
+            summary = self._invoke_llm(self.summary_llm, self._summary_messages(summary, evicted)).content
+
+        recalled = self._recall(state, kept)
+        response = self._invoke_llm(self.llm_with_tools, self._prompt_messages(state, kept, summary, recalled),
+                                    self.tools)
+        return self._model_update(state, response, evicted, summary)
+
+    @metrics.timed("graph_node", node="agent")
+    async def _acall_model(self, state: AgentState):
+        kept, evicted = self.history_window.split(state["messages"])
+        summary = state.get("summary", "")
+        if evicted and self.summarize_history:
+            summary = (await self._ainvoke_llm(self.summary_llm, self._summary_messages(summary, evicted))).content
+
+        recalled = await asyncio.to_thread(self._recall, state, kept) if self.recall is not None else ""
+        response = await self._ainvoke_llm(self.llm_with_tools, self._prompt_messages(state, kept, summary, recalled),
+                                           self.tools)
+        return self._model_update(state, response, evicted, summary)
+
+    def _invoke_llm(self, runnable, messages: list, tools: Sequence = ()) -> AIMessage:
+        key = self.llm_cache.key_for(self.llm, messages, tools) if self.llm_cache is not None else None
+        if key is not None:
+            cached = self.llm_cache.get(key)
+            metrics.increment("llm_cache_lookups_total", result="hit" if cached is not None else "miss")
+            if cached is not None:
+                return cached
+
+        with metrics.timer("llm_call", purpose="agent" if tools else "summary"):
+            response = runnable.invoke(messages)
+        self._record_usage(response)
+        if key is not None:
+            self.llm_cache.set(key, response)
+        return response
+
+    async def _ainvoke_llm(self, runnable, messages: list, tools: Sequence = ()) -> AIMessage:
+        key = self.llm_cache.key_for(self.llm, messages, tools) if self.llm_cache is not None else None
+        if key is not None:
+            cached = await self.llm_cache.aget(key)
+            metrics.increment("llm_cache_lookups_total", result="hit" if cached is not None else "miss")
+            if cached is not None:
+                return cached
+
+        with metrics.timer("llm_call", purpose="agent" if tools else "summary"):
+            response = await runnable.ainvoke(messages)
+        self._record_usage(response)
+        if key is not None:
+            await self.llm_cache.aset(key, response)
+        return response
+
+    @staticmethod
+    def _record_usage(response: AIMessage):
+        usage = getattr(response, 'usage_metadata', None) or {}
+        for kind in ("input_tokens", "output_tokens"):
+            if usage.get(kind):
+                metrics.increment("llm_tokens_total", usage[kind], type=kind.split('_')[0])
+
+    def _recall(self, state: AgentState, kept: list) -> str:
+        """Past exchanges of this user relevant to the current question, formatted for the prompt."""
+        if self.recall is None:
+            return ""
+        questions = [m for m in kept if isinstance(m, HumanMessage) and isinstance(m.content, str)]
+        if not questions:
+            return ""
+        try:
+            # Turns still in the live history are already in front of the model; their
+            # message ids are the conversation ids they were stored under
+            entries = self.recall.search(state.get("user_id", ""), questions[-1].content, self.recall_k,
+                                         exclude=[m.id for m in questions if m.id])
+        except Exception as e:
+            print(f"Warning: Could not recall past conversations: {e}")
+            return ""
+        return format_recalled(entries)
+
+    def _prompt_messages(self, state: AgentState, kept: list, summary: str, recalled: str = "") -> list:
         messages = state["messages"]
-        response = self.llm_with_tools.invoke(messages)
+        # A system message stored in the thread overrides the default prompt
+        system_content = messages[0].content if messages and isinstance(messages[0], SystemMessage) else SYSTEM_PROMPT
+        if summary:
+            system_content += f"\n\nSummary of the earlier conversation:\n{summary}"
+        if recalled:
+            system_content += f"\n\nRelevant earlier exchanges with this user:\n{recalled}"
+        return [SystemMessage(content=system_content)] + kept
 
-        new_count = state.get("conversation_count", 0) + 1
-        last_tool = "none"
+    @staticmethod
+    def _summary_messages(summary: str, evicted: list) -> list:
+        transcript = "\n".join(
+            f"{m.type}: {m.content}" for m in evicted if isinstance(m.content, str) and m.content
+        )
+        if summary:
+            transcript = f"Previous summary: {summary}\n\n{transcript}"
+        return [SystemMessage(content=SUMMARY_PROMPT), HumanMessage(content=transcript)]
 
-        if hasattr(response, 'tool_calls') and response.tool_calls:
-            last_tool = response.tool_calls[0]["name"]
+    def _model_update(self, state: AgentState, response: AIMessage, evicted: list = (), summary: str = ""):
+        new_count = state.get("conversation_count", 0) + 1
 
-        return {
-            "messages": [response],
+        # Evicted turns leave the checkpoint too, so thread state stays bounded
+        update = {
+            "messages": [RemoveMessage(id=m.id) for m in evicted] + [response],
             "conversation_count": new_count,
-            "last_tool_used": last_tool
+            "summary": summary
         }
+        # The final answer carries no tool calls and keeps the tool used earlier in the turn
+        if response.tool_calls:
+            update["last_tool_used"] = response.tool_calls[-1]["name"]
+        return update
 
-    def run(self, message: str, user_id: str = 'default_user') -> str:
+    def _build_input(self, message: str, user_id: str):
         config = {"configurable": {"thread_id": user_id}}
 
-        system_prompt = SystemMessage(content="""You are a friendly and helpful assistant that can help with arithmetic calculations and provide country information.
-
-You have access to two tools:
-1. arithmetic_calculator: For mathematical calculations and expressions
-2. vacation_finder: For getting country information (capital, currency, region)
-
-For simple greetings like "hello" or "hi", respond naturally and offer to help. For questions that require calculations or country information, use the appropriate tools. Be conversational and helpful.""")
-
+        # The system prompt is added at call time rather than stored on every turn.
+        # The message id doubles as the turn's conversation id in memory and recall
         initial_state = {
-            "messages": [system_prompt, HumanMessage(content=message)],
+            "messages": [HumanMessage(content=message, id=str(uuid4()))],
             "user_id": user_id,
             "conversation_count": 0,
             "last_tool_used": "none"
         }
+        return initial_state, config
+
+    @staticmethod
+    def _response_from_event(event) -> str:
+        response_content = ""
+        for value in event.values():
+            if value and "messages" in value:
+                last_message = value["messages"][-1]
+                if isinstance(last_message, AIMessage):
+                    response_content = last_message.content
+        return response_content
+
+    def stream(self, message: str, user_id: str = 'default_user'):
+        initial_state, config = self._build_input(message, user_id)
+        yield from self.graph.stream(initial_state, config)
 
-        events = self.graph.stream(initial_state, config)
+    async def astream(self, message: str, user_id: str = 'default_user'):
+        initial_state, config = self._build_input(message, user_id)
+        async for event in self.graph.astream(initial_state, config):
+            yield event
+
+    def _stream_events(self, mode: str, chunk):
+        """Translate one (mode, chunk) pair from the graph into agent stream events."""
+        if mode == "messages":
+            message, metadata = chunk
+            if (metadata.get("langgraph_node") == "agent" and isinstance(message, AIMessage)
+                    and isinstance(message.content, str) and message.content):
+                yield {"type": "token", "content": message.content}
+            return
+
+        for node, update in chunk.items():
+            if not update or "messages" not in update:
+                continue
+            for message in update["messages"]:
+                if node == "agent" and isinstance(message, AIMessage):
+                    for tool_call in message.tool_calls:
+                        yield {"type": "tool_start", "name": tool_call["name"],
+                               "args": tool_call["args"], "tool_call_id": tool_call["id"]}
+                elif isinstance(message, ToolMessage):
+                    yield {"type": "tool_end", "name": message.name,
+                           "output": message.content, "tool_call_id": message.tool_call_id}
+
+    def stream_response(self, message: str, user_id: str = 'default_user'):
+        """
+        Stream a turn as it happens.
+        Yields token, tool_start and tool_end events, then a single final event.
+        """
+        initial_state, config = self._build_input(message, user_id)
+
+        response_content = ""
+        tool_usages = ToolUsageLog()
+        for mode, chunk in self.graph.stream(initial_state, config, stream_mode=["messages", "updates"]):
+            if mode == "updates":
+                response_content = self._response_from_event(chunk) or response_content
+                tool_usages.observe(chunk)
+            yield from self._stream_events(mode, chunk)
+
+        final_response = self._store_conversation(message, user_id, response_content, tool_usages.usages,
+                                                  self._turn_id(initial_state))
+        yield {"type": "final", "content": final_response}
+
+    async def astream_response(self, message: str, user_id: str = 'default_user'):
+        """Async variant of stream_response."""
+        initial_state, config = self._build_input(message, user_id)
 
         response_content = ""
-        for event in events:
-            for value in event.values():
-                if "messages" in value:
-                    last_message = value["messages"][-1]
-                    if isinstance(last_message, AIMessage):
-                        response_content = last_message.content
+        tool_usages = ToolUsageLog()
+        async for mode, chunk in self.graph.astream(initial_state, config, stream_mode=["messages", "updates"]):
+            if mode == "updates":
+                response_content = self._response_from_event(chunk) or response_content
+                tool_usages.observe(chunk)
+            for event in self._stream_events(mode, chunk):
+                yield event
+
+        final_response = await self._astore_conversation(message, user_id, response_content, tool_usages.usages,
+                                                         self._turn_id(initial_state))
+        yield {"type": "final", "content": final_response}
+
+    @staticmethod
+    def _turn_id(initial_state: dict) -> str:
+        return initial_state["messages"][0].id
+
+    def _remember(self, user_id: str, conversation_id: str, message: str, response: str):
+        if self.recall is None:
+            return
+        try:
+            self.recall.add(user_id, conversation_id, message, response)
+        except Exception as e:
+            print(f"Warning: Could not index conversation for recall: {e}")
 
+    def _store_conversation(self, message: str, user_id: str, response_content: str,
+                            tool_usages: Optional[list] = None, conversation_id: Optional[str] = None) -> str:
         final_response = response_content if response_content else "I couldn't process your request. Please try again."
 
-        # Store conversation in Neo4j
+        # Store conversation and the turn's tool calls in Neo4j in one write
+        conversation_id = conversation_id or str(uuid4())
         try:
             conversation_id = self.neo4j_memory.store_conversation(
                 user_id=user_id,
                 message=message,
-                response=final_response
+                response=final_response,
+                tool_usages=tool_usages,
+                conversation_id=conversation_id
             )
         except Exception as e:
             print(f"Warning: Could not store conversation in Neo4j: {e}")
 
+        if response_content:
+            self._remember(user_id, conversation_id, message, final_response)
         return final_response
 
+    async def _astore_conversation(self, message: str, user_id: str, response_content: str,
+                                   tool_usages: Optional[list] = None, conversation_id: Optional[str] = None) -> str:
+        final_response = response_content if response_content else "I couldn't process your request. Please try again."
+
+        # Store conversation in Neo4j without blocking the event loop
+        conversation_id = conversation_id or str(uuid4())
+        try:
+            conversation_id = await self.neo4j_memory.astore_conversation(
+                user_id=user_id,
+                message=message,
+                response=final_response,
+                tool_usages=tool_usages,
+                conversation_id=conversation_id
+            )
+        except Exception as e:
+            print(f"Warning: Could not store conversation in Neo4j: {e}")
+
+        if response_content and self.recall is not None:
+            await asyncio.to_thread(self._remember, user_id, conversation_id, message, final_response)
+        return final_response
+
+    def run(self, message: str, user_id: str = 'default_user') -> str:
+        initial_state, config = self._build_input(message, user_id)
+        response_content = ""
+        tool_usages = ToolUsageLog()
+        for event in self.graph.stream(initial_state, config):
+            response_content = self._response_from_event(event) or response_content
+            tool_usages.observe(event)
+
+        return self._store_conversation(message, user_id, response_content, tool_usages.usages,
+                                        self._turn_id(initial_state))
+
+    async def arun(self, message: str, user_id: str = 'default_user') -> str:
+        initial_state, config = self._build_input(message, user_id)
+        response_content = ""
+        tool_usages = ToolUsageLog()
+        async for event in self.graph.astream(initial_state, config):
+            response_content = self._response_from_event(event) or response_content
+            tool_usages.observe(event)
+
+        return await self._astore_conversation(message, user_id, response_content, tool_usages.usages,
+                                               self._turn_id(initial_state))
+
+    def get_metrics(self) -> dict:
+        """Latency histograms and counters for this process, plus fast-path and LLM cache hit rates."""
+        snapshot = metrics.snapshot()
+        if self.fast_path is not None:
+            snapshot["fast_path"] = self.fast_path.stats()
+        if self.llm_cache is not None:
+            snapshot["llm_cache"] = self.llm_cache.stats()
+        return snapshot
+
     def get_conversation_history(self, user_id: str, limit: int = 10):
         try:
             # Try to get from Neo4j first
@@ -152,3 +611,24 @@ For simple greetings like "hello" or "hi", respond naturally and offer to help.
             self.neo4j_memory.close()
         except:
             pass
+        self.tool_node.close()
+        if self.llm_cache is not None:
+            self.llm_cache.close()
+        if self.recall is not None:
+            self.recall.close()
+        if hasattr(self.memory, 'close'):
+            self.memory.close()
+
+    async def aclose(self):
+        try:
+            await self.neo4j_memory.aclose()
+        except:
+            pass
+        await VacationTool.aclose_async_client()
+        self.tool_node.close()
+        if self.llm_cache is not None:
+            self.llm_cache.close()
+        if self.recall is not None:
+            self.recall.close()
+        if hasattr(self.memory, 'close'):
+            self.memory.close()
@@ -0,0 +1,283 @@
+"""
+Batch evaluation: run a JSONL file of questions through the agent.
+
+Each input line is an object with a question (or message) and optionally an
+id, a user_id and an expected answer:
+
+    {"id": "capital-peru", "question": "What is the capital of Peru?", "expected": "Lima"}
+
+Questions run concurrently on an async pool; questions sharing a user_id run
+in file order on one thread so multi-turn scripts keep their context. Model
+requests are rate limited with --rps. Results are appended to the output
+JSONL as they complete, one line per question, and a rerun with the same
+output file resumes where an interrupted run left off: conversations (all
+questions of a user_id, or a single question without one) whose every
+question has a result without an error are skipped, and any other
+conversation runs again from its first question, since its context only
+lived in the interrupted run. The output is compacted to one line per id
+before new results are appended.
+
+    python batch.py questions.jsonl -o results.jsonl [--concurrency 8] [--rps 5]
+"""
+from typing import Any, Dict, Iterable, List, Optional, Set
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+from utils.metrics import metrics
+
+
+def load_questions(path: str) -> List[Dict[str, Any]]:
+    """Parse the input file; questions without an id are numbered by line."""
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_number}: invalid JSON: {e}") from None
+            question = item.get("question", item.get("message"))
+            if not isinstance(question, str) or not question.strip():
+                raise ValueError(f"{path}:{line_number}: missing question")
+            questions.append({**item, "id": str(item.get("id", line_number)), "question": question})
+
+    seen = set()
+    for item in questions:
+        if item["id"] in seen:
+            raise ValueError(f"{path}: duplicate question id {item['id']!r}")
+        seen.add(item["id"])
+    return questions
+
+
+def read_results(output_path: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Results in output_path by id, the last line for an id winning. A
+    trailing line cut short by an interruption is truncated so appending
+    stays valid.
+    """
+    if not os.path.exists(output_path):
+        return {}
+    with open(output_path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+            data = data[:data.rfind(b"\n") + 1]
+
+    results = {}
+    for line in data.decode("utf-8").splitlines():
+        try:
+            result = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        results.pop(str(result.get("id")), None)
+        results[str(result.get("id"))] = result
+    return results
+
+
+def completed_ids(output_path: str) -> Set[str]:
+    """Ids that already have a successful result in output_path."""
+    return {question_id for question_id, result in read_results(output_path).items() if "error" not in result}
+
+
+def conversations(questions: Iterable[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Group questions into conversations: by user_id in file order, or one per question without one."""
+    threads: Dict[str, List[Dict[str, Any]]] = {}
+    for item in questions:
+        threads.setdefault(item.get("user_id") or f"question-{item['id']}", []).append(item)
+    return list(threads.values())
+
+
+def answer_matches(answer: str, expected: Any) -> bool:
+    """An expected string (or any of a list of them) appears in the answer, ignoring case."""
+    options = expected if isinstance(expected, list) else [expected]
+    return any(str(option).lower() in answer.lower() for option in options)
+
+
+class BatchRunner:
+    """
+    Runs questions through an agent's astream_response with at most
+    concurrency turns in flight, writing each result to output as soon as it
+    completes. Questions with the same user_id run one after another.
+    """
+
+    def __init__(self, agent, output, concurrency: int = 8, timeout: Optional[float] = None,
+                 thread_prefix: str = "batch"):
+        self.agent = agent
+        self.output = output
+        self.timeout = timeout
+        self.thread_prefix = thread_prefix
+        self._slots = asyncio.Semaphore(concurrency)
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.matched = 0
+        self.scored = 0
+
+    async def _answer(self, item: Dict[str, Any], thread_id: str) -> Dict[str, Any]:
+        answer, tools = "", []
+        async for event in self.agent.astream_response(item["question"], thread_id):
+            if event["type"] == "tool_start":
+                tools.append(event["name"])
+            elif event["type"] == "final":
+                answer = event["content"]
+        return {"answer": answer, "tools": tools}
+
+    async def _run_one(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        thread_id = f"{self.thread_prefix}-{item.get('user_id') or item['id']}"
+        result = {"id": item["id"], "user_id": item.get("user_id"), "question": item["question"]}
+        async with self._slots:
+            start = time.perf_counter()
+            try:
+                with metrics.timer("batch_question"):
+                    result.update(await asyncio.wait_for(self._answer(item, thread_id), self.timeout))
+            except Exception as e:
+                error = f"timed out after {self.timeout:g}s" if isinstance(e, asyncio.TimeoutError) else repr(e)
+                result["error"] = error
+            result["latency_s"] = round(time.perf_counter() - start, 4)
+
+        if "error" in result:
+            self.errors += 1
+        else:
+            self.latencies.append(result["latency_s"])
+        if "expected" in item:
+            result["expected"] = item["expected"]
+            if "answer" in result:
+                result["match"] = answer_matches(result["answer"], item["expected"])
+                self.scored += 1
+                self.matched += result["match"]
+        # One write per line keeps results whole even when the run is killed
+        self.output.write(json.dumps(result, ensure_ascii=False) + "\n")
+        self.output.flush()
+        return result
+
+    async def _run_thread(self, items: List[Dict[str, Any]], progress):
+        for item in items:
+            await self._run_one(item)
+            progress()
+
+    async def run(self, questions: Iterable[Dict[str, Any]], progress=lambda: None):
+        await asyncio.gather(*(self._run_thread(items, progress) for items in conversations(questions)))
+
+    def summary(self) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+        summary = {
+            "completed": len(latencies),
+            "errors": self.errors,
+            "p50_latency_s": statistics.median(latencies) if latencies else None,
+            "p95_latency_s": latencies[min(int(0.95 * len(latencies)), len(latencies) - 1)] if latencies else None,
+        }
+        if self.scored:
+            summary["match_rate"] = self.matched / self.scored
+        return summary
+
+
+def build_agent(concurrency: int, requests_per_second: Optional[float], store_conversations: bool):
+    from agent import VacationArithmeticAgent
+    from langgraph.checkpoint.memory import MemorySaver
+
+    if store_conversations:
+        neo4j_memory = None
+    else:
+        from memory.sqlite_memory import SQLiteMemory
+        neo4j_memory = SQLiteMemory(":memory:")
+    # Threads live in memory so a run never picks up state from an earlier one
+    agent = VacationArithmeticAgent(checkpointer=MemorySaver(), neo4j_memory=neo4j_memory,
+                                    max_tool_workers=max(8, concurrency))
+    if requests_per_second:
+        from langchain_core.rate_limiters import InMemoryRateLimiter
+        # Shared by every turn; cached responses never reach the limiter
+        agent.llm.rate_limiter = InMemoryRateLimiter(requests_per_second=requests_per_second,
+                                                     check_every_n_seconds=0.05,
+                                                     max_bucket_size=max(1.0, requests_per_second))
+    return agent
+
+
+async def run_batch(agent, questions: List[Dict[str, Any]], output_path: str, concurrency: int = 8,
+                    timeout: Optional[float] = None, resume: bool = True, quiet: bool = False) -> Dict[str, Any]:
+    """Run questions through agent into output_path; returns a summary of this run."""
+    results = read_results(output_path) if resume else {}
+    done = {question_id for question_id, result in results.items() if "error" not in result}
+    pending = []
+    for items in conversations(questions):
+        if not all(item["id"] in done for item in items):
+            # Earlier turns run again too, the interrupted run's thread state is gone
+            pending.extend(items)
+    rerun = {item["id"] for item in pending}
+    # Compact to one line per id, dropping the results about to be replaced
+    temporary = f"{output_path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as output:
+        output.writelines(json.dumps(result, ensure_ascii=False) + "\n"
+                          for question_id, result in results.items() if question_id not in rerun)
+    os.replace(temporary, output_path)
+
+    finished = 0
+
+    def progress():
+        nonlocal finished
+        finished += 1
+        if not quiet and (finished % 10 == 0 or finished == len(pending)):
+            print(f"\r{finished}/{len(pending)} questions", end="", file=sys.stderr, flush=True)
+
+    start = time.perf_counter()
+    with open(output_path, "a", encoding="utf-8") as output:
+        runner = BatchRunner(agent, output, concurrency=concurrency, timeout=timeout)
+        await runner.run(pending, progress)
+    if not quiet and pending:
+        print(file=sys.stderr)
+    elapsed = time.perf_counter() - start
+
+    return {"questions": len(questions), "skipped": len(questions) - len(pending), **runner.summary(),
+            "elapsed_s": elapsed, "questions_per_s": len(pending) / elapsed if elapsed else 0.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file of questions")
+    parser.add_argument("-o", "--output", help="JSONL results file (default <input>.results.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=8, help="questions in flight at once")
+    parser.add_argument("--rps", type=float, help="max model requests per second")
+    parser.add_argument("--timeout", type=float, help="seconds allowed per question")
+    parser.add_argument("--no-resume", action="store_true", help="start over instead of skipping answered questions")
+    parser.add_argument("--store-conversations", action="store_true",
+                        help="record the turns in the configured conversation memory")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args()
+
+    questions = load_questions(args.input)
+    output_path = args.output or f"{os.path.splitext(args.input)[0]}.results.jsonl"
+    agent = build_agent(args.concurrency, args.rps, args.store_conversations)
+
+    async def run():
+        try:
+            return await run_batch(agent, questions, output_path, concurrency=args.concurrency,
+                                   timeout=args.timeout, resume=not args.no_resume)
+        finally:
+            # Inside the loop, so its connection pools close with it
+            await agent.aclose()
+
+    try:
+        summary = asyncio.run(run())
+    except KeyboardInterrupt:
+        print(f"\nInterrupted; rerun with the same output file to resume from {output_path}", file=sys.stderr)
+        sys.exit(130)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+    print(f"{summary['questions']} questions: {summary['completed']} answered, {summary['errors']} errors, "
+          f"{summary['skipped']} already done, {summary['elapsed_s']:.1f}s "
+          f"({summary['questions_per_s']:.1f}/s)")
+    if summary["p50_latency_s"] is not None:
+        print(f"latency p50 {summary['p50_latency_s']:.2f}s, p95 {summary['p95_latency_s']:.2f}s")
+    if "match_rate" in summary:
+        print(f"expected answer found in {summary['match_rate']:.0%} of answers")
+    print(f"results in {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Micro-benchmark for ArithmeticTool expression evaluation.
+
+Compares the reference AST walker against the compiled evaluator, both
+cold (compile on every call) and warm (memoized), and prints throughput.
+
+    python -m benchmarks.arithmetic_bench [--iterations N]
+"""
+import argparse
+import ast
+import time
+
+from tools.arithmetic_tool import ArithmeticTool
+from tools.expression import compile_expression, evaluate_expression
+
+EXPRESSIONS = [
+    "2+3*4-5/2",
+    "(1.5 + 2.25) * (3 - 4.75) / 2",
+    "-(2**10) + 3*(4+5)*(6-7)",
+    "((((1+2)*3)-4)/5)**2 + 6*7 - 8/9",
+]
+
+
+def measure(label: str, func, iterations: int):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for expression in EXPRESSIONS:
+            func(expression)
+    elapsed = time.perf_counter() - start
+    calls = iterations * len(EXPRESSIONS)
+    print(f"{label:<28} {calls / elapsed:>12,.0f} evals/s  {elapsed / calls * 1e6:>8.2f} us/eval")
+    return calls / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    tool = ArithmeticTool()
+
+    def walker(expression):
+        return tool.evaluate_ast_node(ast.parse(expression, mode='eval').body)
+
+    def compiled_cold(expression):
+        compile_expression.cache_clear()
+        return compile_expression(expression)({})
+
+    def compiled_warm(expression):
+        return compile_expression(expression)({})
+
+    def memoized(expression):
+        return evaluate_expression(expression)
+
+    for expression in EXPRESSIONS:
+        assert walker(expression) == compiled_warm(expression) == memoized(expression), expression
+
+    baseline = measure("AST walker (parse + walk)", walker, args.iterations)
+    for label, func in [("compiled, cold cache", compiled_cold),
+                        ("compiled, warm cache", compiled_warm),
+                        ("memoized result", memoized)]:
+        rate = measure(label, func, args.iterations)
+        print(f"{'':<28} {rate / baseline:>11.1f}x vs walker")
+
+
+if __name__ == "__main__":
+    main()
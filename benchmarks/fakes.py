@@ -0,0 +1,203 @@
+"""
+Offline stand-ins for the agent's external services, used by the load test.
+
+ScriptedChatModel plays the LLM deterministically, InMemoryConversationStore
+replaces Neo4jMemory, and StubCountriesServer serves the bundled country
+snapshot over HTTP in the REST Countries URL layout.
+"""
+from typing import Any, Dict, List, Optional
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlparse
+from uuid import uuid4
+import asyncio
+import json
+import re
+import threading
+import time
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from tools.country_index import load_country_index
+
+EXPRESSION_PATTERN = re.compile(r"[\d(][\d\s.+\-*/()]*[+\-*/][\d\s.+\-*/()]*[\d)]")
+COUNTRIES_PATTERN = re.compile(r"\b(?:about|compare)\s+(.+?)[?.!]*$", re.IGNORECASE)
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Deterministic chat model that behaves like a tool-using LLM:
+    arithmetic in the last user message becomes an arithmetic_calculator
+    call, "about X" / "compare X, Y and Z" become one vacation_finder call
+    per country, and tool results are summarized into a final answer.
+    latency (seconds) is slept per call to stand in for the network.
+    """
+
+    latency: float = 0.0
+    temperature: float = 0.0
+    model_name: str = "scripted"
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def respond(self, messages: List[BaseMessage]) -> AIMessage:
+        last = messages[-1]
+        prompt_tokens = sum(len(str(m.content)) for m in messages) // 4
+        if isinstance(last, ToolMessage):
+            results = []
+            for message in reversed(messages):
+                if not isinstance(message, ToolMessage):
+                    break
+                results.append(str(message.content).splitlines()[0])
+            content = "Here is what I found: " + "; ".join(reversed(results))
+            return self._message(content, [], prompt_tokens)
+
+        text = last.content if isinstance(last, HumanMessage) and isinstance(last.content, str) else ""
+        calls = []
+        countries = COUNTRIES_PATTERN.search(text)
+        if countries:
+            for name in re.split(r",\s*|\s+and\s+", countries.group(1)):
+                if name.strip():
+                    calls.append({"name": "vacation_finder", "args": {"location": name.strip()}})
+        for expression in EXPRESSION_PATTERN.findall(text):
+            calls.append({"name": "arithmetic_calculator", "args": {"expression": expression.strip()}})
+        if calls:
+            return self._message("", calls, prompt_tokens)
+        return self._message("Happy to help! Ask me about a country or a calculation.", [], prompt_tokens)
+
+    @staticmethod
+    def _message(content: str, calls: List[Dict], prompt_tokens: int) -> AIMessage:
+        tool_calls = [{**call, "id": f"call_{uuid4().hex[:24]}"} for call in calls]
+        output_tokens = max(len(content) // 4, 1) + 20 * len(tool_calls)
+        return AIMessage(content=content, tool_calls=tool_calls, usage_metadata={
+            "input_tokens": prompt_tokens, "output_tokens": output_tokens,
+            "total_tokens": prompt_tokens + output_tokens,
+        })
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self.respond(messages))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self.respond(messages))])
+
+
+class InMemoryConversationStore:
+    """Drop-in replacement for Neo4jMemory that keeps conversations in a dict."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.conversations: Dict[str, List[Dict]] = {}
+        self._lock = threading.Lock()
+
+    def store_conversation(self, user_id: str, message: str, response: str, metadata: Dict = None,
+                           tool_usages: Optional[List[Dict]] = None, conversation_id: Optional[str] = None) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._append(user_id, message, response, metadata, tool_usages, conversation_id)
+
+    async def astore_conversation(self, user_id: str, message: str, response: str, metadata: Dict = None,
+                                  tool_usages: Optional[List[Dict]] = None,
+                                  conversation_id: Optional[str] = None) -> str:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._append(user_id, message, response, metadata, tool_usages, conversation_id)
+
+    def _append(self, user_id: str, message: str, response: str, metadata: Optional[Dict],
+                tool_usages: Optional[List[Dict]], conversation_id: Optional[str]) -> str:
+        record = {
+            'id': conversation_id or str(uuid4()),
+            'message': message,
+            'response': response,
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'metadata': metadata,
+            'tool_usages': list(tool_usages or ()),
+        }
+        with self._lock:
+            self.conversations.setdefault(user_id, []).append(record)
+        return record['id']
+
+    def get_conversation_history(self, user_id: str, limit: int = 10) -> List[Dict]:
+        with self._lock:
+            return list(reversed(self.conversations.get(user_id, [])[-limit:]))
+
+    async def aget_conversation_history(self, user_id: str, limit: int = 10) -> List[Dict]:
+        return self.get_conversation_history(user_id, limit)
+
+    def get_conversation_stats(self, user_id: str) -> Dict:
+        with self._lock:
+            conversations = list(self.conversations.get(user_id, []))
+        uses = Counter(usage['tool_name'] for record in conversations for usage in record['tool_usages'])
+        return {
+            'conversation_count': len(conversations),
+            'most_used_tool': min(uses, key=lambda name: (-uses[name], name)) if uses else None,
+            'total_tool_uses': sum(uses.values()),
+        }
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    async def aclose(self):
+        pass
+
+
+class StubCountriesServer:
+    """
+    Local HTTP server answering GET /name/<country> from the bundled snapshot,
+    after sleeping latency seconds, with a 404 for unknown names.
+    """
+
+    def __init__(self, latency: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        index = load_country_index()
+        self.requests = 0
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests += 1
+                name = unquote(urlparse(self.path).path.rsplit('/', 1)[-1])
+                if latency:
+                    time.sleep(latency)
+                country = index.lookup(name, fuzzy=False)
+                body = json.dumps([country] if country else {"status": 404, "message": "Not Found"}).encode()
+                self.send_response(200 if country else 404)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-countries", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,229 @@
+"""
+Offline load test for VacationArithmeticAgent.
+
+Drives the real graph, tools, router and checkpointer with a scripted chat
+model, a stub REST Countries server and an in-memory conversation store, so
+no network or database is needed. Each simulated user runs its turns in
+order on its own thread id; users run concurrently up to --concurrency.
+Reports throughput, turn latency percentiles, memory growth per thread and
+the agent's per-component latency histograms.
+
+    python -m benchmarks.load_test [--users 50] [--turns 10] [--concurrency 16]
+        [--mix country=4,multi=2,arithmetic=2,fast=1,chat=1] [--llm-latency 0.05]
+        [--countries api|offline] [--checkpointer memory|sqlite] [--json]
+"""
+from typing import Dict, List, Tuple
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.fakes import InMemoryConversationStore, ScriptedChatModel, StubCountriesServer
+
+COUNTRIES = ["France", "Japan", "Brazil", "Kenya", "Canada", "Germany", "India", "Peru",
+             "Norway", "Egypt", "Vietnam", "Mexico", "Italy", "Chile", "Morocco", "Spain"]
+
+SCENARIOS = {
+    "country": lambda rng: f"Tell me about {rng.choice(COUNTRIES)}",
+    "multi": lambda rng: "Compare {}, {} and {}".format(*rng.sample(COUNTRIES, 3)),
+    "arithmetic": lambda rng: f"My budget is {rng.randint(500, 5000)} * {rng.randint(2, 9)} + {rng.randint(10, 99)}, can you work it out",
+    "fast": lambda rng: rng.choice([f"{rng.randint(1, 999)}+{rng.randint(1, 999)}", f"capital of {rng.choice(COUNTRIES)}"]),
+    "chat": lambda rng: rng.choice(["Thanks, that's helpful", "Can you help me plan a trip", "Which one would you pick"]),
+}
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"Unknown scenario {name!r}, choose from {', '.join(SCENARIOS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def build_conversations(users: int, turns: int, mix: Dict[str, float], seed: int) -> List[List[Tuple[str, str]]]:
+    rng = random.Random(seed)
+    names, weights = zip(*mix.items())
+    return [[(scenario, SCENARIOS[scenario](rng)) for scenario in rng.choices(names, weights, k=turns)]
+            for _ in range(users)]
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = min(int(round(q / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[rank]
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+async def run_load(agent, conversations: List[List[Tuple[str, str]]], concurrency: int, run_id: str):
+    slots = asyncio.Semaphore(concurrency)
+    latencies: Dict[str, List[float]] = {}
+    errors = 0
+
+    async def user(index: int, turns: List[Tuple[str, str]]):
+        nonlocal errors
+        user_id = f"{run_id}-user-{index}"
+        for scenario, message in turns:
+            async with slots:
+                start = time.perf_counter()
+                try:
+                    await agent.arun(message, user_id)
+                except Exception as e:
+                    errors += 1
+                    print(f"Turn failed for {user_id}: {e!r}", file=sys.stderr)
+                    continue
+                latencies.setdefault(scenario, []).append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user(index, turns) for index, turns in enumerate(conversations)))
+    return time.perf_counter() - start, latencies, errors
+
+
+def latency_summary(values: List[float]) -> Dict[str, float]:
+    return {
+        "turns": len(values),
+        "mean_ms": statistics.fmean(values) * 1000 if values else 0.0,
+        "p50_ms": percentile(values, 50) * 1000,
+        "p95_ms": percentile(values, 95) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=10, help="turns per user")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("country=4,multi=2,arithmetic=2,fast=1,chat=1"))
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per model call")
+    parser.add_argument("--api-latency", type=float, default=0.03, help="seconds per REST Countries request")
+    parser.add_argument("--countries", choices=["api", "offline"], default="api",
+                        help="serve country lookups from the stub API or the bundled index")
+    parser.add_argument("--checkpointer", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--no-fast-path", action="store_true")
+    parser.add_argument("--warmup", type=int, default=5, help="users run once before measuring")
+    parser.add_argument("--tracemalloc", action="store_true", help="also report Python heap growth (slower)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    with StubCountriesServer(latency=args.api_latency) as stub, tempfile.TemporaryDirectory() as tmp:
+        # Tools read their configuration from the environment when constructed
+        os.environ['REST_COUNTRIES_URL'] = stub.url
+        os.environ['VACATION_OFFLINE_INDEX'] = 'true' if args.countries == 'offline' else 'false'
+        from agent import VacationArithmeticAgent
+        from langgraph.checkpoint.memory import MemorySaver
+        from memory.sqlite_checkpointer import SQLiteCheckpointSaver
+        from tools.vacation_tool import VacationTool
+        from utils.metrics import metrics
+
+        checkpointer = (SQLiteCheckpointSaver(os.path.join(tmp, "checkpoints.sqlite"))
+                        if args.checkpointer == "sqlite" else MemorySaver())
+        agent = VacationArithmeticAgent(
+            llm=ScriptedChatModel(latency=args.llm_latency),
+            neo4j_memory=InMemoryConversationStore(),
+            checkpointer=checkpointer,
+            fast_path=not args.no_fast_path,
+        )
+
+        async def run():
+            if args.warmup:
+                await run_load(agent, build_conversations(args.warmup, 1, args.mix, args.seed + 1),
+                               args.concurrency, "warmup")
+            # Measure country lookups and tools from a cold cache, like a fresh process
+            VacationTool._cache.clear()
+            metrics.reset()
+            gc.collect()
+            if args.tracemalloc:
+                tracemalloc.start()
+            rss_before = rss_bytes()
+            conversations = build_conversations(args.users, args.turns, args.mix, args.seed)
+            elapsed, latencies, errors = await run_load(agent, conversations, args.concurrency, "load")
+            gc.collect()
+            heap = tracemalloc.get_traced_memory()[0] if args.tracemalloc else None
+            if args.tracemalloc:
+                tracemalloc.stop()
+            await VacationTool.aclose_async_client()
+            return elapsed, latencies, errors, rss_bytes() - rss_before, heap
+
+        try:
+            elapsed, latencies, errors, rss_growth, heap_growth = asyncio.run(run())
+            component_metrics = agent.get_metrics()
+        finally:
+            agent.close()
+        api_requests = stub.requests
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    report = {
+        "config": {key: value for key, value in vars(args).items() if key != "json"},
+        "turns": len(all_latencies),
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "throughput_turns_per_s": len(all_latencies) / elapsed if elapsed else 0.0,
+        "latency": latency_summary(all_latencies),
+        "latency_by_scenario": {name: latency_summary(values) for name, values in sorted(latencies.items())},
+        "memory": {
+            "rss_growth_bytes": rss_growth,
+            "rss_growth_per_thread_bytes": rss_growth / args.users if args.users else 0,
+            "heap_growth_per_thread_bytes": heap_growth / args.users if heap_growth is not None and args.users else None,
+        },
+        "country_api_requests": api_requests,
+        "components": [
+            {"name": h["name"], "labels": h["labels"], "count": h["count"],
+             "p50_ms": h["p50"] * 1000, "p95_ms": h["p95"] * 1000}
+            for h in component_metrics["histograms"] if h["count"]
+        ],
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print_report(report)
+
+
+def print_report(report: Dict):
+    latency = report["latency"]
+    print(f"{report['turns']} turns in {report['elapsed_s']:.2f}s "
+          f"({report['throughput_turns_per_s']:.1f} turns/s, {report['errors']} errors)")
+    print(f"turn latency   p50 {latency['p50_ms']:8.1f} ms   p95 {latency['p95_ms']:8.1f} ms   "
+          f"p99 {latency['p99_ms']:8.1f} ms")
+    for name, summary in report["latency_by_scenario"].items():
+        print(f"  {name:<12} {summary['turns']:>5} turns   p50 {summary['p50_ms']:8.1f} ms   "
+              f"p95 {summary['p95_ms']:8.1f} ms   p99 {summary['p99_ms']:8.1f} ms")
+
+    memory = report["memory"]
+    print(f"memory growth  {memory['rss_growth_bytes'] / 1024:.0f} KiB RSS, "
+          f"{memory['rss_growth_per_thread_bytes'] / 1024:.1f} KiB per thread", end="")
+    if memory["heap_growth_per_thread_bytes"] is not None:
+        print(f", {memory['heap_growth_per_thread_bytes'] / 1024:.1f} KiB Python heap per thread", end="")
+    print()
+    print(f"country API requests: {report['country_api_requests']}")
+
+    print("components:")
+    for component in report["components"]:
+        labels = ','.join(f"{k}={v}" for k, v in component["labels"].items())
+        name = f"{component['name']}[{labels}]" if labels else component["name"]
+        print(f"  {name:<44} {component['count']:>6}   p50 {component['p50_ms']:8.2f} ms   "
+              f"p95 {component['p95_ms']:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Cold-start benchmark for VacationArithmeticAgent.
+
+Starts fresh interpreters and times, in each, importing the agent module,
+constructing the agent with its default configuration, and building the
+model client and graph (what the first turn would otherwise pay for).
+Nothing connects to the network or a database: the checkpointer runs in
+memory and Neo4j is only contacted on first use.
+
+    python -m benchmarks.startup [--runs 5] [--json]
+"""
+from typing import Dict, List
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PROBE = """
+import json, time
+started = time.perf_counter()
+import agent
+imported = time.perf_counter()
+instance = agent.VacationArithmeticAgent()
+constructed = time.perf_counter()
+instance.warm_up()
+warmed = time.perf_counter()
+instance.close()
+print(json.dumps({"import": imported - started, "construct": constructed - imported,
+                  "warm_up": warmed - constructed, "modules": len(__import__("sys").modules)}))
+"""
+
+PHASES = ("import", "construct", "warm_up")
+
+
+def probe(cwd: str) -> Dict[str, float]:
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(filter(None, [os.getcwd(), os.environ.get("PYTHONPATH")])),
+        "CHECKPOINT_DB_PATH": ":memory:",
+        "MEMORY_SPOOL_PATH": os.path.join(cwd, "memory_spool.sqlite"),
+        "OPENROUTER_API_KEY": os.environ.get("OPENROUTER_API_KEY", "startup-benchmark"),
+    }
+    output = subprocess.run([sys.executable, "-c", PROBE], cwd=cwd, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # The first run also warms the OS file cache and bytecode, like any real deployment
+        probe(tmp)
+        runs: List[Dict[str, float]] = [probe(tmp) for _ in range(args.runs)]
+
+    report = {
+        "runs": args.runs,
+        "modules_loaded": runs[-1]["modules"],
+        "phases": {
+            phase: {"median_ms": statistics.median(r[phase] for r in runs) * 1000,
+                    "min_ms": min(r[phase] for r in runs) * 1000}
+            for phase in PHASES
+        },
+    }
+    report["ready_median_ms"] = report["phases"]["import"]["median_ms"] + report["phases"]["construct"]["median_ms"]
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    for phase, timing in report["phases"].items():
+        print(f"{phase:<10} median {timing['median_ms']:8.1f} ms   min {timing['min_ms']:8.1f} ms")
+    print(f"ready to serve after {report['ready_median_ms']:.1f} ms, {report['modules_loaded']} modules loaded")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,36 @@
-from agent import VacationArithmeticAgent
+from utils.metrics import metrics, start_metrics_server
+import os
 import sys
+import time
+
+def print_performance(snapshot):
+    histograms = [h for h in snapshot["histograms"] if h["count"]]
+    if histograms or snapshot["counters"]:
+        print(f"\nPerformance (this session):")
+    for histogram in histograms:
+        labels = ', '.join(f"{k}={v}" for k, v in histogram["labels"].items())
+        name = f"{histogram['name']}[{labels}]" if labels else histogram['name']
+        print(f"  * {name}: {histogram['count']} calls, "
+              f"p50 {histogram['p50'] * 1000:.1f} ms, p95 {histogram['p95'] * 1000:.1f} ms, "
+              f"max {histogram['max'] * 1000:.1f} ms")
+    for counter in snapshot["counters"]:
+        labels = ', '.join(f"{k}={v}" for k, v in counter["labels"].items())
+        print(f"  * {counter['name']}{f'[{labels}]' if labels else ''}: {counter['value']:g}")
+    for section in ("fast_path", "llm_cache"):
+        if section in snapshot:
+            print(f"  * {section} hit rate: {snapshot[section]['hit_rate']:.0%}")
 
 def main():
+    # The agent module is imported here so its import time counts towards startup
+    started = time.perf_counter()
+    from agent import VacationArithmeticAgent
     agent = VacationArithmeticAgent()
+    startup = time.perf_counter() - started
+    metrics.observe("startup_seconds", startup, phase="ready")
+    if os.getenv('METRICS_PORT'):
+        start_metrics_server(int(os.getenv('METRICS_PORT')))
 
-    print("LangGraph Vacation and Arithmetic Assistant")
+    print(f"LangGraph Vacation and Arithmetic Assistant (ready in {startup * 1000:.0f} ms)")
     print("\nSpecial commands:")
     print("* 'history' - View conversation history")
     print("* 'stats' - View conversation statistics")
@@ -43,15 +69,26 @@ def main():
                 print(f"  * Total conversations: {stats['conversation_count']}")
                 print(f"  * Last tool used: {stats['last_tool_used']}")
                 print(f"  * Total messages: {stats['total_messages']}")
+                print_performance(agent.get_metrics())
                 print()
                 continue
 
             if not user_input:
                 continue
 
-            print("Processing...")
-            response = agent.run(user_input, user_id)
-            print(f"\nAssistant: {response}\n")
+            print("\nAssistant: ", end="", flush=True)
+            streamed_text = False
+            for event in agent.stream_response(user_input, user_id):
+                if event["type"] == "token":
+                    print(event["content"], end="", flush=True)
+                    streamed_text = True
+                elif event["type"] == "tool_start":
+                    print(f"\n  [using {event['name']}...]", flush=True)
+                    streamed_text = False
+                elif event["type"] == "final" and not streamed_text:
+                    # Model did not stream the final answer, print it in one go
+                    print(event["content"], end="")
+            print("\n")
 
     except KeyboardInterrupt:
         print("\n\nInterrupted by user. Goodbye!")
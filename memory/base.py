@@ -0,0 +1,137 @@
+from typing import Any, Dict, List, Optional, Tuple
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+import asyncio
+import base64
+import uuid
+
+# A history page and the cursor for the next (older) page, or None at the end
+Page = Tuple[List[Dict], Optional[str]]
+
+
+def utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def conversation_row(user_id: str, message: str, response: str, metadata: Dict = None,
+                     tool_usages: Optional[List[Dict]] = None, conversation_id: Optional[str] = None) -> Dict:
+    """
+    A conversation record in the form every backend writes, spools and replays.
+    tool_usages are tool_usage_row keyword arguments (without conversation_id)
+    for the calls made during the turn; they are stored with the conversation.
+    A new conversation_id is generated unless the caller supplies one.
+    """
+    conversation_id = conversation_id or str(uuid.uuid4())
+    return {
+        'id': conversation_id,
+        'timestamp': utc_now(),
+        'user_id': user_id,
+        'message': message,
+        'response': response,
+        'metadata': metadata or None,
+        'tool_usages': [tool_usage_row(conversation_id, **usage) for usage in tool_usages or ()]
+    }
+
+
+def tool_usage_row(conversation_id: str, tool_name: str, input_data: str, output_data: str,
+                   duration: Optional[float] = None, status: str = 'success') -> Dict:
+    return {
+        'id': str(uuid.uuid4()),
+        'conversation_id': conversation_id,
+        'tool_name': tool_name,
+        'input_data': input_data,
+        'output_data': output_data,
+        'output_size': len(output_data or ''),
+        'duration': duration,
+        'status': status,
+        'timestamp': utc_now()
+    }
+
+
+def encode_cursor(timestamp: str, record_id: str) -> str:
+    """Opaque keyset cursor pointing just past the record with this timestamp and id."""
+    return base64.urlsafe_b64encode(f"{timestamp}|{record_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        timestamp, _, record_id = base64.urlsafe_b64decode(cursor.encode()).decode().partition('|')
+    except (ValueError, UnicodeDecodeError):
+        timestamp = record_id = ''
+    if not timestamp or not record_id:
+        raise ValueError(f"Invalid history cursor: {cursor!r}")
+    return timestamp, record_id
+
+
+class ConversationMemory(ABC):
+    """
+    Long-term conversation store used by the agent. Implementations generate
+    conversation ids (unless the caller passes one) and timestamps
+    client-side, so writes can be buffered, spooled and replayed without
+    changing what callers were given.
+    """
+
+    @abstractmethod
+    def store_conversation(self, user_id: str, message: str, response: str, metadata: Dict = None,
+                           tool_usages: Optional[List[Dict]] = None, conversation_id: Optional[str] = None) -> str:
+        """Record one turn and the tool calls made during it in one write, and return its conversation id."""
+
+    async def astore_conversation(self, user_id: str, message: str, response: str, metadata: Dict = None,
+                                  tool_usages: Optional[List[Dict]] = None,
+                                  conversation_id: Optional[str] = None) -> str:
+        return await asyncio.to_thread(self.store_conversation, user_id, message, response, metadata, tool_usages,
+                                       conversation_id)
+
+    @abstractmethod
+    def get_conversation_page(self, user_id: str, limit: int = 10, cursor: Optional[str] = None) -> Page:
+        """One page of a user's conversations, most recent first."""
+
+    async def aget_conversation_page(self, user_id: str, limit: int = 10, cursor: Optional[str] = None) -> Page:
+        return await asyncio.to_thread(self.get_conversation_page, user_id, limit, cursor)
+
+    def get_conversation_history(self, user_id: str, limit: int = 10) -> List[Dict]:
+        """
+        Retrieve recent conversation history for a specific user.
+        Returns conversations sorted by most recent first.
+        """
+        return self.get_conversation_page(user_id, limit)[0]
+
+    async def aget_conversation_history(self, user_id: str, limit: int = 10) -> List[Dict]:
+        return (await self.aget_conversation_page(user_id, limit))[0]
+
+    @abstractmethod
+    def store_tool_usage(self, conversation_id: str, tool_name: str, input_data: str, output_data: str,
+                         duration: Optional[float] = None, status: str = 'success'):
+        """Record a tool call made while answering a conversation."""
+
+    @abstractmethod
+    def get_user_preferences(self, user_id: str) -> Dict:
+        ...
+
+    @abstractmethod
+    def update_user_preferences(self, user_id: str, preferences: Dict):
+        ...
+
+    @abstractmethod
+    def get_conversation_stats(self, user_id: str) -> Dict:
+        """conversation_count, most_used_tool and total_tool_uses for a user."""
+
+    @abstractmethod
+    def delete_user_data(self, user_id: str):
+        ...
+
+    def flush(self):
+        """Wait until buffered writes are durable; a no-op for unbuffered backends."""
+
+    def health_check(self) -> bool:
+        """Whether the backend can currently serve reads and writes."""
+        return True
+
+    def close(self):
+        pass
+
+    async def aclose(self):
+        await asyncio.to_thread(self.close)
+
+    def status(self) -> Dict[str, Any]:
+        return {"backend": type(self).__name__}
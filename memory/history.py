@@ -0,0 +1,61 @@
+from typing import List, Optional, Sequence, Tuple
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+
+def approximate_token_count(message: BaseMessage) -> int:
+    """
+    Cheap token estimate (roughly four characters per token).
+    Good enough for budgeting a history window without a tokenizer.
+    """
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    tokens = len(content) // 4 + 4
+    for tool_call in getattr(message, 'tool_calls', None) or []:
+        tokens += len(str(tool_call.get('args', ''))) // 4 + 4
+    return tokens
+
+
+class HistoryWindow:
+    """
+    Decides which part of a thread's history is sent to the model.
+    The window is bounded by message count and/or an approximate token budget,
+    and always starts at a user turn so tool calls are never split from their results.
+    """
+
+    def __init__(self, max_messages: Optional[int] = None, max_tokens: Optional[int] = None):
+        self.max_messages = max_messages
+        self.max_tokens = max_tokens
+
+    def split(self, messages: Sequence[BaseMessage]) -> Tuple[List[BaseMessage], List[BaseMessage]]:
+        """Return (kept, evicted); system messages are never part of either."""
+        history = [m for m in messages if not isinstance(m, SystemMessage)]
+        start = 0
+
+        if self.max_messages is not None and len(history) > self.max_messages:
+            start = len(history) - self.max_messages
+
+        if self.max_tokens is not None:
+            budget = self.max_tokens
+            index = len(history)
+            while index > start:
+                budget -= approximate_token_count(history[index - 1])
+                if budget < 0:
+                    break
+                index -= 1
+            start = max(start, index)
+
+        if start == 0:
+            return history, []
+
+        start = self._align_to_user_turn(history, start)
+        return history[start:], history[:start]
+
+    @staticmethod
+    def _align_to_user_turn(history: List[BaseMessage], start: int) -> int:
+        # Prefer dropping a little more; fall back to keeping the whole current turn
+        for index in range(start, len(history)):
+            if isinstance(history[index], HumanMessage):
+                return index
+        for index in range(min(start, len(history) - 1), -1, -1):
+            if isinstance(history[index], HumanMessage):
+                return index
+        return 0
@@ -1,22 +1,211 @@
-from typing import Dict, List, Any
-from neo4j import GraphDatabase
+from typing import Callable, Dict, List, Any, Optional, Tuple
+from memory.base import ConversationMemory, Page, conversation_row, decode_cursor, encode_cursor, tool_usage_row
+from memory.write_behind import WriteBehindQueue
+from utils.metrics import metrics
+import asyncio
 import os
+import threading
 from dotenv import load_dotenv
-from datetime import datetime
 
 load_dotenv()
 
-class Neo4jMemory:
-    def __init__(self):
-        uri = os.getenv('NEO4J_URI')
-        username = os.getenv('NEO4J_USERNAME')
-        password = os.getenv('NEO4J_PASSWORD')
+# Bump when _initialize_schema changes so existing deployments pick it up
+SCHEMA_VERSION = 1
 
-        self.driver = GraphDatabase.driver(uri, auth=(username, password))
-        self._initialize_schema()
+
+def is_connection_error(error: Exception) -> bool:
+    """Whether error means the database cannot be reached, as opposed to a bad query."""
+    if isinstance(error, OSError):
+        return True
+    # The driver is imported on first connect, so its errors only exist from then on
+    from neo4j.exceptions import DriverError
+    return isinstance(error, DriverError)
+
+class Neo4jMemory(ConversationMemory):
+    # Ids and timestamps are generated client-side so writes can be batched.
+    # Merging on the id makes retried and replayed batches idempotent. A turn's
+    # tool usages are created from the conversation node already in hand, so
+    # linking them needs no lookup and no extra statement.
+    STORE_CONVERSATIONS_QUERY = """
+        UNWIND $rows AS row
+        MERGE (u:User {id: row.user_id})
+        MERGE (c:Conversation {id: row.id})
+        ON CREATE SET c.user_id = row.user_id,
+                      c.timestamp = datetime(row.timestamp),
+                      c.message = row.message,
+                      c.response = row.response,
+                      c.metadata = row.metadata
+        MERGE (u)-[:HAD_CONVERSATION]->(c)
+        FOREACH (usage IN coalesce(row.tool_usages, []) |
+            MERGE (c)-[:USED_TOOL]->(t:ToolUsage {id: usage.id})
+            SET t.tool_name = usage.tool_name,
+                t.input = usage.input_data,
+                t.output = usage.output_data,
+                t.output_size = usage.output_size,
+                t.duration = usage.duration,
+                t.status = usage.status,
+                t.timestamp = datetime(usage.timestamp)
+        )
+    """
+
+    STORE_TOOL_USAGES_QUERY = """
+        UNWIND $rows AS row
+        MATCH (c:Conversation {id: row.conversation_id})
+        MERGE (c)-[:USED_TOOL]->(t:ToolUsage {id: row.id})
+        SET t.tool_name = row.tool_name,
+            t.input = row.input_data,
+            t.output = row.output_data,
+            t.output_size = row.output_size,
+            t.duration = row.duration,
+            t.status = row.status,
+            t.timestamp = datetime(row.timestamp)
+    """
+
+    # Conversations carry their user's id so history pages are read straight off
+    # the (user_id, timestamp) index in order, instead of sorting every node
+    CONVERSATION_HISTORY_QUERY = """
+        MATCH (c:Conversation)
+        WHERE c.user_id = $user_id AND c.timestamp IS NOT NULL  // lets the planner order by the index
+        RETURN c.id as id,
+               c.message as message,
+               c.response as response,
+               c.timestamp as timestamp,
+               c.metadata as metadata
+        ORDER BY c.timestamp DESC, c.id DESC
+        LIMIT $limit
+    """
+
+    # Keyset pagination: continue strictly after the (timestamp, id) of the last row seen
+    CONVERSATION_PAGE_QUERY = """
+        MATCH (c:Conversation)
+        WHERE c.user_id = $user_id AND c.timestamp <= datetime($before_timestamp)
+          AND (c.timestamp < datetime($before_timestamp) OR c.id < $before_id)
+        RETURN c.id as id,
+               c.message as message,
+               c.response as response,
+               c.timestamp as timestamp,
+               c.metadata as metadata
+        ORDER BY c.timestamp DESC, c.id DESC
+        LIMIT $limit
+    """
+
+    # The composite index only serves a lookup that also constrains timestamp,
+    # hence IS NOT NULL (every conversation is written with one)
+    CONVERSATION_STATS_QUERY = """
+        CALL {
+            MATCH (c:Conversation)
+            WHERE c.user_id = $user_id AND c.timestamp IS NOT NULL
+            RETURN count(c) AS conversation_count
+        }
+        CALL {
+            MATCH (c:Conversation)-[:USED_TOOL]->(t:ToolUsage)
+            WHERE c.user_id = $user_id AND c.timestamp IS NOT NULL
+            WITH t.tool_name AS tool_name, count(*) AS uses
+            ORDER BY uses DESC, tool_name
+            RETURN collect(tool_name) AS tools, sum(uses) AS total_tool_uses
+        }
+        RETURN conversation_count, tools[0] AS most_used_tool, total_tool_uses
+    """
+
+    # Conversations written before user_id was stored on them
+    BACKFILL_USER_IDS_QUERY = """
+        MATCH (u:User)-[:HAD_CONVERSATION]->(c:Conversation)
+        WHERE c.user_id IS NULL
+        CALL { WITH u, c SET c.user_id = u.id } IN TRANSACTIONS OF 10000 ROWS
+    """
+
+    def __init__(self, write_behind: Optional[bool] = None,
+                 on_write_failure: Optional[Callable[[List[tuple], Exception], None]] = None):
+        self.uri = os.getenv('NEO4J_URI')
+        self.auth = (os.getenv('NEO4J_USERNAME'), os.getenv('NEO4J_PASSWORD'))
+        # Fail fast when the server is down instead of retrying for the driver's default 30s
+        self.driver_config = {
+            'connection_timeout': float(os.getenv('NEO4J_CONNECTION_TIMEOUT', 5.0)),
+            'max_transaction_retry_time': float(os.getenv('NEO4J_RETRY_TIME', 5.0)),
+        }
+        # Batches the write-behind queue gives up on are handed here, e.g. to a spool
+        self.on_write_failure = on_write_failure
+
+        # Neither the neo4j package nor a connection is needed until the first
+        # query, so a slow or unreachable server does not block startup. The
+        # async driver is also bound to an event loop, so it is only created
+        # the first time one of the async methods is awaited.
+        self._driver = None
+        self._schema_ready = False
+        self._connect_lock = threading.Lock()
+        self._async_driver = None
+
+        if write_behind is None:
+            write_behind = os.getenv('NEO4J_WRITE_BEHIND', 'true').lower() != 'false'
+        # Conversation and tool usage writes are buffered and flushed in
+        # batches off the request path
+        self.write_queue = WriteBehindQueue(
+            self.write_records,
+            batch_size=int(os.getenv('NEO4J_WRITE_BATCH_SIZE', 100)),
+            flush_interval=float(os.getenv('NEO4J_WRITE_FLUSH_INTERVAL', 1.0)),
+            max_pending=int(os.getenv('NEO4J_WRITE_MAX_PENDING', 10000)),
+            on_failure=self._handle_write_failure,
+            name="neo4j-write-behind"
+        ) if write_behind else None
+
+    @property
+    def driver(self):
+        """Sync driver, created and schema-checked on first use."""
+        if not self._schema_ready:
+            with self._connect_lock:
+                if not self._schema_ready:
+                    self.ensure_schema()
+        return self._driver
+
+    @property
+    def async_driver(self):
+        if self._async_driver is None:
+            from neo4j import AsyncGraphDatabase
+            self._async_driver = AsyncGraphDatabase.driver(self.uri, auth=self.auth, **self.driver_config)
+        return self._async_driver
+
+    def health_check(self) -> bool:
+        try:
+            self.driver.verify_connectivity()
+            return True
+        except Exception as e:
+            if not is_connection_error(e):
+                raise
+            return False
+
+    def ensure_schema(self, force: bool = False):
+        """
+        Create constraints and indexes unless the database already records
+        SCHEMA_VERSION, so they run once per deployment rather than on every
+        process start. NEO4J_SKIP_SCHEMA=true skips even the version check,
+        e.g. when a migration step runs `python -m memory.neo4j_memory`.
+        """
+        if self._driver is None:
+            from neo4j import GraphDatabase
+            self._driver = GraphDatabase.driver(self.uri, auth=self.auth, **self.driver_config)
+
+        needed = force
+        if not force and os.getenv('NEO4J_SKIP_SCHEMA', 'false').lower() != 'true':
+            with self._driver.session() as session:
+                record = session.run(
+                    "MATCH (s:SchemaVersion {id: 'memory'}) RETURN s.version AS version"
+                ).single()
+            needed = record is None or record['version'] < SCHEMA_VERSION
+        if needed:
+            self._initialize_schema()
+            with self._driver.session() as session:
+                session.run("MERGE (s:SchemaVersion {id: 'memory'}) SET s.version = $version",
+                            version=SCHEMA_VERSION).consume()
+        self._schema_ready = True
+
+    def _handle_write_failure(self, records: List[tuple], error: Exception):
+        if self.on_write_failure is None:
+            print(f"Warning: Dropping {len(records)} buffered writes: {error}")
+        else:
+            self.on_write_failure(records, error)
 
     def _initialize_schema(self):
-        with self.driver.session() as session:
+        with self._driver.session() as session:
             # Ensure each conversation has a unique ID
             session.run("""
                 CREATE CONSTRAINT conversation_id IF NOT EXISTS
@@ -27,72 +216,116 @@ class Neo4jMemory:
                 CREATE CONSTRAINT user_id IF NOT EXISTS
                 FOR (u:User) REQUIRE u.id IS UNIQUE
             """)
+            # Serves history pages and stats for one user without scanning all conversations
+            session.run("""
+                CREATE INDEX conversation_user_timestamp IF NOT EXISTS
+                FOR (c:Conversation) ON (c.user_id, c.timestamp)
+            """)
+            session.run("""
+                CREATE INDEX tool_usage_name IF NOT EXISTS
+                FOR (t:ToolUsage) ON (t.tool_name)
+            """)
+            session.run(self.BACKFILL_USER_IDS_QUERY).consume()
+
+    @metrics.timed("neo4j", operation="write_batch")
+    def write_records(self, records: List[tuple]):
+        """Write buffered records in one transaction, conversations before the tool usages that link to them."""
+        conversations = [row for kind, row in records if kind == 'conversation']
+        tool_usages = [row for kind, row in records if kind == 'tool_usage']
+
+        def work(tx):
+            if conversations:
+                tx.run(self.STORE_CONVERSATIONS_QUERY, rows=conversations).consume()
+            if tool_usages:
+                tx.run(self.STORE_TOOL_USAGES_QUERY, rows=tool_usages).consume()
 
-    def store_conversation(self, user_id: str, message: str, response: str, metadata: Dict = None):
         with self.driver.session() as session:
-            query = """
-                MERGE (u:User {id: $user_id})
-                CREATE (c:Conversation {
-                    id: randomUUID(),
-                    timestamp: datetime(),
-                    message: $message,
-                    response: $response,
-                    metadata: $metadata
-                })
-                CREATE (u)-[:HAD_CONVERSATION]->(c)
-                RETURN c.id as conversation_id
-            """
-            result = session.run(
-                query,
-                user_id=user_id,
-                message=message,
-                response=response,
-                metadata=metadata or None
-            )
-            return result.single()['conversation_id']
-
-    def get_conversation_history(self, user_id: str, limit: int = 10) -> List[Dict]:
+            session.execute_write(work)
+        metrics.increment("neo4j_records_written_total", len(records))
+
+    @metrics.timed("neo4j", operation="store_conversation")
+    def store_conversation(self, user_id: str, message: str, response: str, metadata: Dict = None,
+                           tool_usages: Optional[List[Dict]] = None, conversation_id: Optional[str] = None):
+        row = conversation_row(user_id, message, response, metadata, tool_usages, conversation_id)
+        if self.write_queue is not None:
+            self.write_queue.put(('conversation', row))
+        else:
+            self.write_records([('conversation', row)])
+        return row['id']
+
+    @metrics.timed("neo4j", operation="astore_conversation")
+    async def astore_conversation(self, user_id: str, message: str, response: str, metadata: Dict = None,
+                                  tool_usages: Optional[List[Dict]] = None, conversation_id: Optional[str] = None):
+        """Async variant of store_conversation using the async driver."""
+        row = conversation_row(user_id, message, response, metadata, tool_usages, conversation_id)
+        if self.write_queue is not None:
+            await self.write_queue.aput(('conversation', row))
+            return row['id']
+
+        async with self.async_driver.session() as session:
+            result = await session.run(self.STORE_CONVERSATIONS_QUERY, rows=[row])
+            await result.consume()
+        return row['id']
+
+    def flush(self):
+        """Wait until all buffered writes have reached the database."""
+        if self.write_queue is not None:
+            self.write_queue.flush()
+
+    def _page_query(self, user_id: str, limit: int, cursor: Optional[str]) -> Tuple[str, Dict]:
+        if cursor is None:
+            return self.CONVERSATION_HISTORY_QUERY, {'user_id': user_id, 'limit': limit}
+        before_timestamp, before_id = decode_cursor(cursor)
+        return self.CONVERSATION_PAGE_QUERY, {
+            'user_id': user_id, 'limit': limit,
+            'before_timestamp': before_timestamp, 'before_id': before_id,
+        }
+
+    @staticmethod
+    def _page(records: List[Dict], limit: int) -> Page:
+        last = records[-1] if records and len(records) == limit else None
+        return records, encode_cursor(last['timestamp'].iso_format(), last['id']) if last else None
+
+    @metrics.timed("neo4j", operation="get_conversation_page")
+    def get_conversation_page(self, user_id: str, limit: int = 10, cursor: Optional[str] = None) -> Page:
         """
-        Retrieve recent conversation history for a specific user.
-        Returns conversations sorted by most recent first.
+        Retrieve one page of a user's conversations, most recent first.
+        Returns the records and a cursor for the next (older) page, or None
+        when there are no more. Cost depends on the page size, not on how many
+        conversations the user has.
         """
+        self.flush()
+        query, parameters = self._page_query(user_id, limit, cursor)
         with self.driver.session() as session:
-            query = """
-                MATCH (u:User {id: $user_id})-[:HAD_CONVERSATION]->(c:Conversation)
-                RETURN c.message as message,
-                       c.response as response,
-                       c.timestamp as timestamp,
-                       c.metadata as metadata
-                ORDER BY c.timestamp DESC
-                LIMIT $limit
-            """
-            results = session.run(query, user_id=user_id, limit=limit)
-            return [dict(record) for record in results]
+            records = [dict(record) for record in session.run(query, **parameters)]
+        return self._page(records, limit)
 
-    def store_tool_usage(self, conversation_id: str, tool_name: str, input_data: str, output_data: str):
+    @metrics.timed("neo4j", operation="aget_conversation_page")
+    async def aget_conversation_page(self, user_id: str, limit: int = 10, cursor: Optional[str] = None) -> Page:
+        """Async variant of get_conversation_page."""
+        await asyncio.to_thread(self.flush)
+        query, parameters = self._page_query(user_id, limit, cursor)
+        async with self.async_driver.session() as session:
+            results = await session.run(query, **parameters)
+            records = [dict(record) async for record in results]
+        return self._page(records, limit)
+
+    @metrics.timed("neo4j", operation="store_tool_usage")
+    def store_tool_usage(self, conversation_id: str, tool_name: str, input_data: str, output_data: str,
+                         duration: Optional[float] = None, status: str = 'success'):
         """
         Record when a tool was used during a conversation.
-        Links tool usage to the specific conversation for analytics.
+        Links tool usage to the specific conversation for analytics. Calls
+        made during a turn are better passed to store_conversation, which
+        writes them in the same statement.
         """
-        with self.driver.session() as session:
-            query = """
-                MATCH (c:Conversation {id: $conversation_id})
-                CREATE (t:ToolUsage {
-                    tool_name: $tool_name,
-                    input: $input_data,
-                    output: $output_data,
-                    timestamp: datetime()
-                })
-                CREATE (c)-[:USED_TOOL]->(t)
-            """
-            session.run(
-                query,
-                conversation_id=conversation_id,
-                tool_name=tool_name,
-                input_data=input_data,
-                output_data=output_data
-            )
+        row = tool_usage_row(conversation_id, tool_name, input_data, output_data, duration, status)
+        if self.write_queue is not None:
+            self.write_queue.put(('tool_usage', row))
+        else:
+            self.write_records([('tool_usage', row)])
 
+    @metrics.timed("neo4j", operation="get_user_preferences")
     def get_user_preferences(self, user_id: str) -> Dict:
         """
         Retrieve user preferences from the database.
@@ -106,6 +339,7 @@ class Neo4jMemory:
             result = session.run(query, user_id=user_id).single()
             return result['preferences'] if result else {}
 
+    @metrics.timed("neo4j", operation="update_user_preferences")
     def update_user_preferences(self, user_id: str, preferences: Dict):
         """
         Save or update user preferences in the database.
@@ -118,37 +352,32 @@ class Neo4jMemory:
             """
             session.run(query, user_id=user_id, preferences=preferences)
 
+    @metrics.timed("neo4j", operation="get_conversation_stats")
     def get_conversation_stats(self, user_id: str) -> Dict:
         """
         Get statistics about a user's conversations.
         Returns count of conversations and most used tool.
         """
+        self.flush()
         with self.driver.session() as session:
-            query = """
-                MATCH (u:User {id: $user_id})-[:HAD_CONVERSATION]->(c:Conversation)
-                OPTIONAL MATCH (c)-[:USED_TOOL]->(t:ToolUsage)
-                RETURN count(c) as conversation_count,
-                       collect(t.tool_name) as tools_used
-            """
-            result = session.run(query, user_id=user_id).single()
-
-            if result:
-                tools = result['tools_used']
-                # Find most frequently used tool
-                most_used_tool = max(set(tools), key=tools.count) if tools else None
+            # Counted and ranked in the database; only one row comes back
+            result = session.run(self.CONVERSATION_STATS_QUERY, user_id=user_id).single()
 
-                return {
-                    'conversation_count': result['conversation_count'],
-                    'most_used_tool': most_used_tool,
-                    'total_tool_uses': len(tools)
-                }
-            return {'conversation_count': 0, 'most_used_tool': None, 'total_tool_uses': 0}
+        if result:
+            return {
+                'conversation_count': result['conversation_count'],
+                'most_used_tool': result['most_used_tool'],
+                'total_tool_uses': result['total_tool_uses']
+            }
+        return {'conversation_count': 0, 'most_used_tool': None, 'total_tool_uses': 0}
 
+    @metrics.timed("neo4j", operation="delete_user_data")
     def delete_user_data(self, user_id: str):
         """
         Remove all data for a specific user.
         Useful for privacy compliance or testing cleanup.
         """
+        self.flush()
         with self.driver.session() as session:
             query = """
                 MATCH (u:User {id: $user_id})
@@ -159,5 +388,26 @@ class Neo4jMemory:
             session.run(query, user_id=user_id)
 
     def close(self):
-        """Close the database connection when done."""
-        self.driver.close()
\ No newline at end of file
+        """Flush buffered writes and close the database connection when done."""
+        if self.write_queue is not None:
+            self.write_queue.close()
+        if self._driver is not None:
+            self._driver.close()
+
+    async def aclose(self):
+        """Close both the sync and async database connections."""
+        if self.write_queue is not None:
+            await asyncio.to_thread(self.write_queue.close)
+        if self._async_driver is not None:
+            await self._async_driver.close()
+            self._async_driver = None
+        if self._driver is not None:
+            self._driver.close()
+
+
+if __name__ == "__main__":
+    # Deployment step: apply the schema once, then start workers with NEO4J_SKIP_SCHEMA=true
+    memory = Neo4jMemory(write_behind=False)
+    memory.ensure_schema(force=True)
+    print(f"Neo4j schema is at version {SCHEMA_VERSION}")
+    memory.close()
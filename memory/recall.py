@@ -0,0 +1,262 @@
+from typing import Dict, List, Optional, Sequence
+from abc import ABC, abstractmethod
+from array import array
+from collections import Counter, OrderedDict
+from memory.base import utc_now
+from utils.metrics import metrics
+import hashlib
+import math
+import re
+import sqlite3
+import threading
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Function words carry no topic and would make every pair of exchanges look alike
+STOP_WORDS = frozenset("""
+a an and are as at be but by can could do does for from had has have how i if in is it its me my
+of on or our so than that the their them then there these they this to was we were what when where
+which who will with would you your
+""".split())
+
+
+def _numpy():
+    # Optional: brute-force search falls back to plain Python without it
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _normalize(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(value * value for value in vector))
+    return [value / norm for value in vector] if norm else vector
+
+
+class Embedder(ABC):
+    """Turns texts into unit-length vectors of a fixed dimension."""
+
+    dimensions: int
+
+    @property
+    def name(self) -> str:
+        """Identifies the vector space; stored vectors from another embedder are re-embedded."""
+        return f"{type(self).__name__}-{self.dimensions}"
+
+    @abstractmethod
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        ...
+
+
+class HashingEmbedder(Embedder):
+    """
+    Local embedder with no model to download: word unigrams and bigrams are
+    hashed into a fixed number of signed buckets with sublinear term
+    frequency. It matches on shared wording (countries, amounts, topics)
+    rather than meaning, which is what recall of past exchanges mostly needs.
+    """
+
+    def __init__(self, dimensions: int = 512):
+        self.dimensions = dimensions
+
+    def _bucket(self, feature: str):
+        digest = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), 'little')
+        return digest % self.dimensions, 1.0 if digest >> 63 else -1.0
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        vectors = []
+        for text in texts:
+            tokens = [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+            features = Counter(tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])])
+            vector = [0.0] * self.dimensions
+            for feature, count in features.items():
+                index, sign = self._bucket(feature)
+                vector[index] += sign * (1.0 + math.log(count))
+            vectors.append(_normalize(vector))
+        return vectors
+
+
+class LangChainEmbedder(Embedder):
+    """Adapts any LangChain Embeddings model, e.g. OpenAIEmbeddings or a local sentence-transformer."""
+
+    def __init__(self, embeddings, dimensions: int):
+        self.embeddings = embeddings
+        self.dimensions = dimensions
+
+    @property
+    def name(self) -> str:
+        model = getattr(self.embeddings, 'model', None) or getattr(self.embeddings, 'model_name', None)
+        return f"{type(self.embeddings).__name__}-{model}-{self.dimensions}"
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        return [_normalize(list(vector)) for vector in self.embeddings.embed_documents(list(texts))]
+
+
+class _UserIndex:
+    """One user's exchanges and their vectors, searched by brute force."""
+
+    def __init__(self):
+        self.entries: List[Dict] = []
+        self.vectors: List[array] = []
+        self._matrix = None
+
+    def add(self, entry: Dict, vector: array, max_entries: int):
+        self.entries.append(entry)
+        self.vectors.append(vector)
+        if len(self.entries) > max_entries:
+            del self.entries[:-max_entries], self.vectors[:-max_entries]
+        self._matrix = None
+
+    def scores(self, query: List[float]) -> List[float]:
+        np = _numpy()
+        if np is None:
+            return [sum(a * b for a, b in zip(vector, query)) for vector in self.vectors]
+        if self._matrix is None:
+            self._matrix = np.frombuffer(b''.join(v.tobytes() for v in self.vectors), dtype=np.float32)
+            self._matrix = self._matrix.reshape(len(self.vectors), -1)
+        return (self._matrix @ np.asarray(query, dtype=np.float32)).tolist()
+
+
+class ConversationRecall:
+    """
+    Embedding index over each user's past exchanges, so the most relevant
+    ones can be put back into the prompt while the live history stays short.
+    Vectors are kept in memory per user (the most recent max_per_user) for
+    the cache_size most recently active users and, when path is given,
+    persisted to SQLite and loaded again on a user's next use. Without a
+    path, an evicted user's exchanges are forgotten.
+    """
+
+    def __init__(self, embedder: Optional[Embedder] = None, path: Optional[str] = None,
+                 max_per_user: int = 5000, cache_size: int = 256):
+        self.embedder = embedder or HashingEmbedder()
+        self.path = path
+        self.max_per_user = max_per_user
+        self.cache_size = cache_size
+        self._users: OrderedDict = OrderedDict()
+        self._lock = threading.RLock()
+        self._conn = None
+        if path is not None:
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA busy_timeout=5000")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS recall_entries (
+                    conversation_id TEXT PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    message TEXT,
+                    response TEXT,
+                    embedder TEXT NOT NULL,
+                    vector BLOB NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS recall_entries_user ON recall_entries (user_id, timestamp);
+            """)
+
+    @staticmethod
+    def _text(message: str, response: str) -> str:
+        return f"{message}\n{response}"
+
+    def _user(self, user_id: str) -> _UserIndex:
+        with self._lock:
+            index = self._users.get(user_id)
+            if index is None:
+                index = self._users[user_id] = self._load(user_id)
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.cache_size:
+                self._users.popitem(last=False)
+        return index
+
+    def _load(self, user_id: str) -> _UserIndex:
+        index = _UserIndex()
+        if self._conn is None:
+            return index
+        rows = self._conn.execute(
+            "SELECT conversation_id, timestamp, message, response, embedder, vector FROM recall_entries "
+            "WHERE user_id = ? ORDER BY timestamp DESC LIMIT ?", (user_id, self.max_per_user)
+        ).fetchall()[::-1]
+        # Rows from a different embedder live in another vector space
+        stale = [row for row in rows if row[4] != self.embedder.name]
+        refreshed = {}
+        if stale:
+            vectors = self.embedder.embed([self._text(row[2], row[3]) for row in stale])
+            refreshed = {row[0]: vector for row, vector in zip(stale, vectors)}
+            self._conn.executemany(
+                "UPDATE recall_entries SET embedder = ?, vector = ? WHERE conversation_id = ?",
+                [(self.embedder.name, array('f', vector).tobytes(), conversation_id)
+                 for conversation_id, vector in refreshed.items()]
+            )
+        for conversation_id, timestamp, message, response, _, blob in rows:
+            if conversation_id in refreshed:
+                vector = array('f', refreshed[conversation_id])
+            else:
+                vector = array('f')
+                vector.frombytes(blob)
+            entry = {'conversation_id': conversation_id, 'timestamp': timestamp,
+                     'message': message, 'response': response}
+            index.add(entry, vector, self.max_per_user)
+        return index
+
+    @metrics.timed("recall", operation="add")
+    def add(self, user_id: str, conversation_id: str, message: str, response: str):
+        """Index one exchange for later recall."""
+        vector = array('f', self.embedder.embed([self._text(message, response)])[0])
+        entry = {'conversation_id': conversation_id, 'timestamp': utc_now(),
+                 'message': message, 'response': response}
+        index = self._user(user_id)
+        with self._lock:
+            index.add(entry, vector, self.max_per_user)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO recall_entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (conversation_id, user_id, entry['timestamp'], message, response,
+                     self.embedder.name, vector.tobytes())
+                )
+
+    @metrics.timed("recall", operation="search")
+    def search(self, user_id: str, query: str, k: int = 3, min_score: float = 0.1,
+               exclude: Sequence[str] = ()) -> List[Dict]:
+        """
+        The user's k past exchanges most similar to query, best first, each
+        with its cosine similarity as score. Exchanges whose conversation id
+        is in exclude (e.g. still in the live history) are skipped.
+        """
+        index = self._user(user_id)
+        if not index.entries or not query.strip():
+            return []
+        query_vector = self.embedder.embed([query])[0]
+        with self._lock:
+            scores = index.scores(query_vector)
+            entries = list(index.entries)
+        skip = set(exclude)
+        ranked = sorted(range(len(entries)), key=scores.__getitem__, reverse=True)
+        results = []
+        for position in ranked:
+            if scores[position] < min_score or len(results) == k:
+                break
+            if entries[position]['conversation_id'] not in skip:
+                results.append({**entries[position], 'score': scores[position]})
+        return results
+
+    def delete_user(self, user_id: str):
+        with self._lock:
+            self._users.pop(user_id, None)
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM recall_entries WHERE user_id = ?", (user_id,))
+
+    def close(self):
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+
+
+def format_recalled(entries: List[Dict], max_chars: int = 300) -> str:
+    """Render recalled exchanges compactly for the system prompt."""
+    def clip(text: str) -> str:
+        text = ' '.join((text or '').split())
+        return text if len(text) <= max_chars else text[:max_chars - 3] + '...'
+
+    return "\n".join(f"- User: {clip(entry['message'])}\n  Assistant: {clip(entry['response'])}"
+                     for entry in entries)
@@ -0,0 +1,181 @@
+from typing import Dict, List, Optional
+from memory.base import ConversationMemory, Page, conversation_row, tool_usage_row
+from memory.neo4j_memory import Neo4jMemory, is_connection_error
+from memory.sqlite_memory import SQLiteMemory
+from utils.metrics import metrics
+import asyncio
+import threading
+
+
+class ResilientMemory(ConversationMemory):
+    """
+    Neo4j memory that keeps working while the server is unreachable.
+    Writes that cannot reach Neo4j, including batches the write-behind queue
+    gave up on, are spooled to a local SQLite file and reads are served from
+    it. A background thread health-checks Neo4j every retry_interval seconds
+    and replays the spool in bulk once it is back.
+    """
+
+    def __init__(self, primary: Neo4jMemory, spool: SQLiteMemory, retry_interval: float = 30.0,
+                 replay_batch_size: int = 500):
+        self.primary = primary
+        self.spool = spool
+        self.retry_interval = retry_interval
+        self.replay_batch_size = replay_batch_size
+        self.primary.on_write_failure = self._spool_failed_batch
+
+        # Assume Neo4j is up until a call says otherwise, so startup never waits on it
+        self._available = True
+        self._state_lock = threading.Lock()
+        self._replay_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._monitor = threading.Thread(target=self._monitor_loop, name="memory-monitor", daemon=True)
+        self._monitor.start()
+
+    @property
+    def available(self) -> bool:
+        return self._available
+
+    def _mark_down(self, error: Exception):
+        with self._state_lock:
+            if self._available:
+                print(f"Warning: Neo4j unavailable, spooling writes to {self.spool.path}: {error}")
+            self._available = False
+
+    def _primary_failed(self, error: Exception):
+        """Fall back to the spool on connection errors; anything else is a real failure."""
+        if not is_connection_error(error):
+            raise error
+        self._mark_down(error)
+
+    def _spool(self, records: List[tuple]):
+        self.spool.write_records(records)
+        metrics.increment("memory_spooled_records_total", len(records))
+
+    def _spool_failed_batch(self, records: List[tuple], error: Exception):
+        self._spool(records)
+        if is_connection_error(error):
+            self._mark_down(error)
+
+    def _monitor_loop(self):
+        # Also drains records left in the spool by a previous run
+        while not self._closed.wait(self.retry_interval):
+            if self._available and not self.spool.pending_count():
+                continue
+            try:
+                self.recover()
+            except Exception as e:
+                print(f"Warning: Could not replay spooled memory writes: {e}")
+
+    def recover(self) -> bool:
+        """Replay the spool into Neo4j if it is reachable; returns whether Neo4j is available."""
+        with self._replay_lock:
+            if not self.primary.health_check():
+                self._available = False
+                return False
+            try:
+                replayed = self.spool.replay(self.primary.write_records, self.replay_batch_size)
+            except Exception as e:
+                self._primary_failed(e)
+                return False
+            with self._state_lock:
+                if not self._available:
+                    print(f"Neo4j is back, replayed {replayed} spooled records")
+                self._available = True
+            return True
+
+    def health_check(self) -> bool:
+        return self._available
+
+    def store_conversation(self, user_id: str, message: str, response: str, metadata: Dict = None,
+                           tool_usages: Optional[List[Dict]] = None, conversation_id: Optional[str] = None) -> str:
+        if self._available:
+            try:
+                return self.primary.store_conversation(user_id, message, response, metadata, tool_usages,
+                                                       conversation_id)
+            except Exception as e:
+                self._primary_failed(e)
+        row = conversation_row(user_id, message, response, metadata, tool_usages, conversation_id)
+        self._spool([('conversation', row)])
+        return row['id']
+
+    async def astore_conversation(self, user_id: str, message: str, response: str, metadata: Dict = None,
+                                  tool_usages: Optional[List[Dict]] = None,
+                                  conversation_id: Optional[str] = None) -> str:
+        if self._available:
+            try:
+                return await self.primary.astore_conversation(user_id, message, response, metadata, tool_usages,
+                                                              conversation_id)
+            except Exception as e:
+                self._primary_failed(e)
+        row = conversation_row(user_id, message, response, metadata, tool_usages, conversation_id)
+        await asyncio.to_thread(self._spool, [('conversation', row)])
+        return row['id']
+
+    def store_tool_usage(self, conversation_id: str, tool_name: str, input_data: str, output_data: str,
+                         duration: Optional[float] = None, status: str = 'success'):
+        if self._available:
+            try:
+                return self.primary.store_tool_usage(conversation_id, tool_name, input_data, output_data,
+                                                     duration, status)
+            except Exception as e:
+                self._primary_failed(e)
+        row = tool_usage_row(conversation_id, tool_name, input_data, output_data, duration, status)
+        self._spool([('tool_usage', row)])
+
+    def _read(self, method: str, *args):
+        """Call method on Neo4j, or on the spool while Neo4j is down."""
+        if self._available:
+            try:
+                return getattr(self.primary, method)(*args)
+            except Exception as e:
+                self._primary_failed(e)
+        return getattr(self.spool, method)(*args)
+
+    def get_conversation_page(self, user_id: str, limit: int = 10, cursor: Optional[str] = None) -> Page:
+        """
+        Pages come from Neo4j, or from the spool while it is down, which then
+        only holds the conversations recorded during the outage.
+        """
+        return self._read('get_conversation_page', user_id, limit, cursor)
+
+    async def aget_conversation_page(self, user_id: str, limit: int = 10, cursor: Optional[str] = None) -> Page:
+        if self._available:
+            try:
+                return await self.primary.aget_conversation_page(user_id, limit, cursor)
+            except Exception as e:
+                self._primary_failed(e)
+        return await asyncio.to_thread(self.spool.get_conversation_page, user_id, limit, cursor)
+
+    def get_user_preferences(self, user_id: str) -> Dict:
+        return self._read('get_user_preferences', user_id)
+
+    def update_user_preferences(self, user_id: str, preferences: Dict):
+        # Not spooled: a stale preference replayed later could overwrite a newer one
+        self.primary.update_user_preferences(user_id, preferences)
+
+    def get_conversation_stats(self, user_id: str) -> Dict:
+        return self._read('get_conversation_stats', user_id)
+
+    def delete_user_data(self, user_id: str):
+        self.spool.delete_user_data(user_id)
+        self.primary.delete_user_data(user_id)
+
+    def flush(self):
+        self.primary.flush()
+
+    def close(self):
+        """Stop the monitor, flush Neo4j writes (failures land in the spool) and close both stores."""
+        self._closed.set()
+        self._monitor.join()
+        self.primary.close()
+        self.spool.close()
+
+    async def aclose(self):
+        self._closed.set()
+        await asyncio.to_thread(self._monitor.join)
+        await self.primary.aclose()
+        self.spool.close()
+
+    def status(self) -> Dict:
+        return {"backend": "neo4j", "available": self._available, "spooled_records": self.spool.pending_count()}
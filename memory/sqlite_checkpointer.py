@@ -0,0 +1,477 @@
+from typing import Any, Dict, Iterator, AsyncIterator, List, Optional, Sequence, Tuple
+from collections import OrderedDict
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from utils.metrics import metrics
+import asyncio
+import random
+import sqlite3
+import threading
+import time
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver[str]):
+    """
+    LangGraph checkpointer backed by a local SQLite file.
+    Writes are buffered and flushed in batches, the latest checkpoint of hot
+    threads is kept in an LRU cache, and idle threads expire after a TTL.
+    Several worker processes can point at the same file (WAL mode).
+    """
+
+    def __init__(self, path: str = "checkpoints.sqlite", batch_size: int = 32,
+                 flush_interval: float = 0.5, cache_size: int = 256,
+                 ttl_seconds: Optional[float] = None, eviction_interval: float = 300.0,
+                 validate_cache: bool = True, serde=None):
+        super().__init__(serde=serde)
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.cache_size = cache_size
+        self.ttl_seconds = ttl_seconds
+        self.eviction_interval = eviction_interval
+        # Re-check the latest checkpoint id on cache hits so another process
+        # writing the same thread never leaves us serving stale state
+        self.validate_cache = validate_cache
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._initialize_schema()
+
+        # Rows waiting for the next batched flush, per table
+        self._pending_checkpoints: List[tuple] = []
+        self._pending_blobs: List[tuple] = []
+        self._pending_writes: List[tuple] = []
+        self._pending_special_writes: List[tuple] = []
+        self._pending_threads: Dict[str, float] = {}
+        self._last_flush = time.monotonic()
+        self._last_eviction = time.monotonic()
+
+        # (thread_id, checkpoint_ns) -> serialized latest checkpoint. Entries hold
+        # serialized data so callers can never mutate what is cached.
+        self._cache: OrderedDict = OrderedDict()
+
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="checkpoint-flusher", daemon=True)
+        self._flusher.start()
+
+    def _initialize_schema(self):
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA busy_timeout=5000")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    thread_id TEXT NOT NULL,
+                    checkpoint_ns TEXT NOT NULL DEFAULT '',
+                    checkpoint_id TEXT NOT NULL,
+                    parent_checkpoint_id TEXT,
+                    type TEXT,
+                    checkpoint BLOB,
+                    metadata_type TEXT,
+                    metadata BLOB,
+                    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+                );
+                CREATE TABLE IF NOT EXISTS blobs (
+                    thread_id TEXT NOT NULL,
+                    checkpoint_ns TEXT NOT NULL DEFAULT '',
+                    channel TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    type TEXT NOT NULL,
+                    blob BLOB,
+                    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+                );
+                CREATE TABLE IF NOT EXISTS writes (
+                    thread_id TEXT NOT NULL,
+                    checkpoint_ns TEXT NOT NULL DEFAULT '',
+                    checkpoint_id TEXT NOT NULL,
+                    task_id TEXT NOT NULL,
+                    idx INTEGER NOT NULL,
+                    channel TEXT NOT NULL,
+                    type TEXT,
+                    value BLOB,
+                    task_path TEXT NOT NULL DEFAULT '',
+                    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+                );
+                CREATE TABLE IF NOT EXISTS threads (
+                    thread_id TEXT PRIMARY KEY,
+                    last_access REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS threads_last_access ON threads (last_access);
+            """)
+
+    def _has_pending(self) -> bool:
+        return bool(self._pending_checkpoints or self._pending_blobs or self._pending_writes
+                    or self._pending_special_writes or self._pending_threads)
+
+    def _pending_count(self) -> int:
+        return (len(self._pending_checkpoints) + len(self._pending_blobs)
+                + len(self._pending_writes) + len(self._pending_special_writes))
+
+    def flush(self):
+        """Write all buffered rows to SQLite in a single transaction."""
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._has_pending():
+                return
+            conn = self._conn
+            with metrics.timer("checkpoint", operation="flush"):
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.executemany("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)", self._pending_blobs)
+                    conn.executemany("INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                     self._pending_checkpoints)
+                    # Regular writes are idempotent per (task, idx); special writes overwrite
+                    conn.executemany("INSERT OR IGNORE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                     self._pending_writes)
+                    conn.executemany("INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                     self._pending_special_writes)
+                    conn.executemany("INSERT OR REPLACE INTO threads VALUES (?, ?)", self._pending_threads.items())
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+            self._pending_checkpoints.clear()
+            self._pending_blobs.clear()
+            self._pending_writes.clear()
+            self._pending_special_writes.clear()
+            self._pending_threads.clear()
+
+    def _maybe_flush(self):
+        if self._pending_count() >= self.batch_size:
+            self.flush()
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.flush_interval):
+            try:
+                with self._lock:
+                    if self._has_pending() and time.monotonic() - self._last_flush >= self.flush_interval:
+                        self.flush()
+                if self.ttl_seconds is not None and time.monotonic() - self._last_eviction >= self.eviction_interval:
+                    self.evict_idle_threads()
+            except Exception as e:
+                print(f"Warning: Could not flush checkpoints to {self.path}: {e}")
+
+    def _cache_get(self, key: Tuple[str, str]) -> Optional[Dict]:
+        entry = self._cache.get(key)
+        if entry is not None:
+            self._cache.move_to_end(key)
+        return entry
+
+    def _cache_put(self, key: Tuple[str, str], entry: Dict):
+        self._cache[key] = entry
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _latest_checkpoint_id(self, thread_id: str, checkpoint_ns: str) -> Optional[str]:
+        row = self._conn.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT 1",
+            (thread_id, checkpoint_ns),
+        ).fetchone()
+        return row[0] if row else None
+
+    def _load_entry(self, thread_id: str, checkpoint_ns: str, checkpoint_id: Optional[str]) -> Optional[Dict]:
+        if checkpoint_id:
+            row = self._conn.execute(
+                "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata "
+                "FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                (thread_id, checkpoint_ns, checkpoint_id),
+            ).fetchone()
+        else:
+            row = self._conn.execute(
+                "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata "
+                "FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                "ORDER BY checkpoint_id DESC LIMIT 1",
+                (thread_id, checkpoint_ns),
+            ).fetchone()
+        if row is None:
+            return None
+        return self._entry_from_row(thread_id, checkpoint_ns, row)
+
+    def _entry_from_row(self, thread_id: str, checkpoint_ns: str, row: tuple) -> Dict:
+        checkpoint_id, parent_checkpoint_id, type_, checkpoint, metadata_type, metadata = row
+        checkpoint_ = self.serde.loads_typed((type_, checkpoint))
+        blobs = {}
+        for channel, version in checkpoint_["channel_versions"].items():
+            blob = self._conn.execute(
+                "SELECT type, blob FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? "
+                "AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, str(version)),
+            ).fetchone()
+            if blob is not None:
+                blobs[channel] = (blob[0], blob[1])
+        writes = self._conn.execute(
+            "SELECT task_path, task_id, idx, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return {
+            "checkpoint_id": checkpoint_id,
+            "parent_checkpoint_id": parent_checkpoint_id,
+            "checkpoint": (type_, checkpoint),
+            "metadata": (metadata_type, metadata),
+            "blobs": blobs,
+            # (task_path, task_id, idx) -> (task_id, channel, typed value)
+            "writes": {(task_path, task_id, idx): (task_id, channel, (type_, value))
+                       for task_path, task_id, idx, channel, type_, value in writes},
+        }
+
+    def _tuple_from_entry(self, thread_id: str, checkpoint_ns: str, entry: Dict) -> CheckpointTuple:
+        checkpoint_: Checkpoint = self.serde.loads_typed(entry["checkpoint"])
+        channel_values = {
+            channel: self.serde.loads_typed(blob)
+            for channel, blob in entry["blobs"].items()
+            if blob[0] != "empty"
+        }
+        parent_checkpoint_id = entry["parent_checkpoint_id"]
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": entry["checkpoint_id"],
+                }
+            },
+            checkpoint={**checkpoint_, "channel_values": channel_values},
+            metadata=self.serde.loads_typed(entry["metadata"]),
+            pending_writes=[(task_id, channel, self.serde.loads_typed(value))
+                            for task_id, channel, value in (entry["writes"][k] for k in sorted(entry["writes"]))],
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+        )
+
+    @metrics.timed("checkpoint", operation="get_tuple")
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id: str = config["configurable"]["thread_id"]
+        checkpoint_ns: str = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        key = (thread_id, checkpoint_ns)
+
+        with self._lock:
+            entry = self._cache_get(key)
+            if entry is not None and checkpoint_id and entry["checkpoint_id"] != checkpoint_id:
+                entry = None
+            if (entry is not None and not checkpoint_id and self.validate_cache
+                    and thread_id not in self._pending_threads
+                    and self._latest_checkpoint_id(thread_id, checkpoint_ns) != entry["checkpoint_id"]):
+                entry = None
+
+            if entry is None:
+                self.flush()
+                entry = self._load_entry(thread_id, checkpoint_ns, checkpoint_id)
+                if entry is None:
+                    return None
+                if not checkpoint_id:
+                    self._cache_put(key, entry)
+
+            result = self._tuple_from_entry(thread_id, checkpoint_ns, entry)
+        if checkpoint_id:
+            result = result._replace(config=config)
+        return result
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        query = ("SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+                 "metadata_type, metadata FROM checkpoints")
+        clauses, params = [], []
+        if config:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if config["configurable"].get("checkpoint_ns") is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(config["configurable"]["checkpoint_ns"])
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_checkpoint_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_checkpoint_id)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY thread_id, checkpoint_ns, checkpoint_id DESC"
+
+        with self._lock:
+            self.flush()
+            rows = self._conn.execute(query, params).fetchall()
+
+        for thread_id, checkpoint_ns, *row in rows:
+            if limit is not None and limit <= 0:
+                break
+            metadata = self.serde.loads_typed((row[4], row[5]))
+            if filter and not all(metadata.get(k) == v for k, v in filter.items()):
+                continue
+            if limit is not None:
+                limit -= 1
+            with self._lock:
+                entry = self._entry_from_row(thread_id, checkpoint_ns, tuple(row))
+            yield self._tuple_from_entry(thread_id, checkpoint_ns, entry)
+
+    @metrics.timed("checkpoint", operation="put")
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        c = checkpoint.copy()
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        parent_checkpoint_id = config["configurable"].get("checkpoint_id")
+        values: Dict[str, Any] = c.pop("channel_values")
+
+        new_blobs = {
+            k: self.serde.dumps_typed(values[k]) if k in values else ("empty", b"")
+            for k in new_versions
+        }
+        checkpoint_typed = self.serde.dumps_typed(c)
+        metadata_typed = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+
+        with self._lock:
+            for k, v in new_versions.items():
+                self._pending_blobs.append((thread_id, checkpoint_ns, k, str(v), *new_blobs[k]))
+            self._pending_checkpoints.append((
+                thread_id, checkpoint_ns, checkpoint["id"], parent_checkpoint_id,
+                *checkpoint_typed, *metadata_typed,
+            ))
+            self._pending_threads[thread_id] = time.time()
+
+            # Derive the new cache entry from the cached parent when we have it
+            key = (thread_id, checkpoint_ns)
+            parent = self._cache.get(key)
+            if parent_checkpoint_id is None or (parent is not None and parent["checkpoint_id"] == parent_checkpoint_id):
+                blobs = {k: v for k, v in parent["blobs"].items() if k in c["channel_versions"]} if parent_checkpoint_id else {}
+                blobs.update(new_blobs)
+                self._cache_put(key, {
+                    "checkpoint_id": checkpoint["id"],
+                    "parent_checkpoint_id": parent_checkpoint_id,
+                    "checkpoint": checkpoint_typed,
+                    "metadata": metadata_typed,
+                    "blobs": blobs,
+                    "writes": {},
+                })
+            else:
+                self._cache.pop(key, None)
+
+            self._maybe_flush()
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    @metrics.timed("checkpoint", operation="put_writes")
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+
+        with self._lock:
+            key = (thread_id, checkpoint_ns)
+            cached = self._cache.get(key)
+            if cached is not None and cached["checkpoint_id"] != checkpoint_id:
+                cached = None
+
+            for idx, (channel, value) in enumerate(writes):
+                write_idx = WRITES_IDX_MAP.get(channel, idx)
+                typed = self.serde.dumps_typed(value)
+                row = (thread_id, checkpoint_ns, checkpoint_id, task_id, write_idx, channel, *typed, task_path)
+                if write_idx >= 0:
+                    self._pending_writes.append(row)
+                else:
+                    self._pending_special_writes.append(row)
+                if cached is not None:
+                    # Mirror the INSERT OR IGNORE / OR REPLACE semantics of the flush
+                    write_key = (task_path, task_id, write_idx)
+                    if write_idx < 0 or write_key not in cached["writes"]:
+                        cached["writes"][write_key] = (task_id, channel, typed)
+
+            self._pending_threads[thread_id] = time.time()
+            self._maybe_flush()
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self.flush()
+            self._conn.execute("BEGIN IMMEDIATE")
+            for table in ("checkpoints", "blobs", "writes", "threads"):
+                self._conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+            self._conn.execute("COMMIT")
+            for key in [k for k in self._cache if k[0] == thread_id]:
+                del self._cache[key]
+
+    def evict_idle_threads(self) -> int:
+        """Delete threads that have not been written for longer than the TTL."""
+        if self.ttl_seconds is None:
+            return 0
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            self._last_eviction = time.monotonic()
+            self.flush()
+            expired = [row[0] for row in self._conn.execute(
+                "SELECT thread_id FROM threads WHERE last_access < ?", (cutoff,)
+            )]
+            for thread_id in expired:
+                self.delete_thread(thread_id)
+        return len(expired)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        next_v = current_v + 1
+        next_h = random.random()
+        return f"{next_v:032}.{next_h:016}"
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None,
+                    limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def close(self):
+        """Flush buffered checkpoints and close the database file."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._flusher.join()
+        with self._lock:
+            self.flush()
+            self._conn.close()
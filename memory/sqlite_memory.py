@@ -0,0 +1,240 @@
+from typing import Callable, Dict, List, Optional
+from memory.base import ConversationMemory, Page, conversation_row, decode_cursor, encode_cursor, tool_usage_row
+from utils.metrics import metrics
+import json
+import sqlite3
+import threading
+
+
+class SQLiteMemory(ConversationMemory):
+    """
+    Conversation memory in a local SQLite file. Used on its own when no
+    Neo4j server is configured, and as the spool that holds writes while
+    Neo4j is unreachable until they can be replayed in bulk.
+    """
+
+    def __init__(self, path: str = "memory.sqlite"):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._initialize_schema()
+
+    def _initialize_schema(self):
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA busy_timeout=5000")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS users (
+                    id TEXT PRIMARY KEY,
+                    preferences TEXT
+                );
+                CREATE TABLE IF NOT EXISTS conversations (
+                    id TEXT PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    message TEXT,
+                    response TEXT,
+                    metadata TEXT
+                );
+                CREATE TABLE IF NOT EXISTS tool_usages (
+                    id TEXT PRIMARY KEY,
+                    conversation_id TEXT NOT NULL,
+                    tool_name TEXT NOT NULL,
+                    input TEXT,
+                    output TEXT,
+                    output_size INTEGER,
+                    duration REAL,
+                    status TEXT,
+                    timestamp TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS conversations_user_timestamp ON conversations (user_id, timestamp, id);
+                CREATE INDEX IF NOT EXISTS tool_usages_conversation ON tool_usages (conversation_id);
+            """)
+
+    def write_records(self, records: List[tuple]):
+        """
+        Write ('conversation' | 'tool_usage', row) records in one transaction,
+        including the tool usages nested in conversation rows.
+        """
+        conversations = [(row['id'], row['user_id'], row['timestamp'], row['message'], row['response'],
+                          json.dumps(row['metadata']) if row['metadata'] is not None else None)
+                         for kind, row in records if kind == 'conversation']
+        usage_rows = [row for kind, row in records if kind == 'tool_usage']
+        usage_rows += [usage for kind, row in records if kind == 'conversation'
+                       for usage in row.get('tool_usages', ())]
+        tool_usages = [(row['id'], row['conversation_id'], row['tool_name'], row['input_data'], row['output_data'],
+                        row['output_size'], row['duration'], row['status'], row['timestamp'])
+                       for row in usage_rows]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("INSERT OR IGNORE INTO users (id) VALUES (?)",
+                                       {(row[1],) for row in conversations})
+                # Replayed records keep their ids, so writing one twice is a no-op
+                self._conn.executemany("INSERT OR IGNORE INTO conversations VALUES (?, ?, ?, ?, ?, ?)",
+                                       conversations)
+                self._conn.executemany("INSERT OR IGNORE INTO tool_usages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                       tool_usages)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return (self._conn.execute("SELECT count(*) FROM conversations").fetchone()[0]
+                    + self._conn.execute("SELECT count(*) FROM tool_usages").fetchone()[0])
+
+    def replay(self, write_records: Callable[[List[tuple]], None], batch_size: int = 500) -> int:
+        """
+        Hand every stored record to write_records in batches, deleting each
+        batch once it was written. Tool usages travel nested in their
+        conversation row, as they were stored. Returns the number of records
+        replayed; a failing batch stops the replay and stays stored for the
+        next attempt.
+        """
+        replayed = 0
+        while True:
+            with self._lock:
+                conversations = self._conn.execute(
+                    "SELECT * FROM conversations ORDER BY timestamp, id LIMIT ?", (batch_size,)
+                ).fetchall()
+                ids = [row['id'] for row in conversations]
+                placeholders = ','.join('?' * len(ids))
+                # Usages of the selected conversations, plus ones whose conversation was already written
+                tool_usages = self._conn.execute(f"""
+                    SELECT rowid, * FROM tool_usages
+                    WHERE conversation_id IN ({placeholders})
+                       OR conversation_id NOT IN (SELECT id FROM conversations)
+                    ORDER BY rowid LIMIT ?
+                """, (*ids, batch_size * 4)).fetchall()
+            if not conversations and not tool_usages:
+                return replayed
+
+            nested: Dict[str, List[Dict]] = {conversation_id: [] for conversation_id in ids}
+            records = []
+            for row in tool_usages:
+                usage = self._tool_usage_row(row)
+                if usage['conversation_id'] in nested:
+                    nested[usage['conversation_id']].append(usage)
+                else:
+                    records.append(('tool_usage', usage))
+            records = [('conversation', {**self._conversation_row(row), 'tool_usages': nested[row['id']]})
+                       for row in conversations] + records
+            write_records(records)
+
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                self._conn.executemany("DELETE FROM conversations WHERE id = ?", [(i,) for i in ids])
+                self._conn.executemany("DELETE FROM tool_usages WHERE rowid = ?",
+                                       [(row['rowid'],) for row in tool_usages])
+                self._conn.execute("COMMIT")
+            replayed += len(conversations) + len(tool_usages)
+            metrics.increment("memory_replayed_records_total", len(conversations) + len(tool_usages))
+
+    @staticmethod
+    def _conversation_row(row: sqlite3.Row) -> Dict:
+        return {
+            'id': row['id'],
+            'timestamp': row['timestamp'],
+            'user_id': row['user_id'],
+            'message': row['message'],
+            'response': row['response'],
+            'metadata': json.loads(row['metadata']) if row['metadata'] is not None else None
+        }
+
+    @staticmethod
+    def _tool_usage_row(row: sqlite3.Row) -> Dict:
+        return {
+            'id': row['id'],
+            'conversation_id': row['conversation_id'],
+            'tool_name': row['tool_name'],
+            'input_data': row['input'],
+            'output_data': row['output'],
+            'output_size': row['output_size'],
+            'duration': row['duration'],
+            'status': row['status'],
+            'timestamp': row['timestamp']
+        }
+
+    def store_conversation(self, user_id: str, message: str, response: str, metadata: Dict = None,
+                           tool_usages: Optional[List[Dict]] = None, conversation_id: Optional[str] = None) -> str:
+        row = conversation_row(user_id, message, response, metadata, tool_usages, conversation_id)
+        self.write_records([('conversation', row)])
+        return row['id']
+
+    def get_conversation_page(self, user_id: str, limit: int = 10, cursor: Optional[str] = None) -> Page:
+        """
+        Retrieve one page of a user's conversations, most recent first.
+        Timestamps are ISO-8601 strings in UTC, so they sort as text.
+        """
+        query = "SELECT id, message, response, timestamp, metadata FROM conversations WHERE user_id = ?"
+        parameters = [user_id]
+        if cursor is not None:
+            before_timestamp, before_id = decode_cursor(cursor)
+            query += " AND (timestamp, id) < (?, ?)"
+            parameters += [before_timestamp, before_id]
+        query += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(query, (*parameters, limit)).fetchall()
+
+        records = [{**dict(row), 'metadata': json.loads(row['metadata']) if row['metadata'] is not None else None}
+                   for row in rows]
+        last = records[-1] if records and len(records) == limit else None
+        return records, encode_cursor(last['timestamp'], last['id']) if last else None
+
+    def store_tool_usage(self, conversation_id: str, tool_name: str, input_data: str, output_data: str,
+                         duration: Optional[float] = None, status: str = 'success'):
+        row = tool_usage_row(conversation_id, tool_name, input_data, output_data, duration, status)
+        self.write_records([('tool_usage', row)])
+
+    def get_user_preferences(self, user_id: str) -> Dict:
+        with self._lock:
+            row = self._conn.execute("SELECT preferences FROM users WHERE id = ?", (user_id,)).fetchone()
+        return json.loads(row['preferences']) if row and row['preferences'] else {}
+
+    def update_user_preferences(self, user_id: str, preferences: Dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO users (id, preferences) VALUES (?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET preferences = excluded.preferences",
+                (user_id, json.dumps(preferences))
+            )
+
+    def get_conversation_stats(self, user_id: str) -> Dict:
+        with self._lock:
+            conversation_count = self._conn.execute(
+                "SELECT count(*) FROM conversations WHERE user_id = ?", (user_id,)
+            ).fetchone()[0]
+            tools = self._conn.execute("""
+                SELECT t.tool_name, count(*) AS uses
+                FROM tool_usages t JOIN conversations c ON c.id = t.conversation_id
+                WHERE c.user_id = ?
+                GROUP BY t.tool_name
+                ORDER BY uses DESC, t.tool_name
+            """, (user_id,)).fetchall()
+        return {
+            'conversation_count': conversation_count,
+            'most_used_tool': tools[0]['tool_name'] if tools else None,
+            'total_tool_uses': sum(row['uses'] for row in tools)
+        }
+
+    def delete_user_data(self, user_id: str):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute(
+                "DELETE FROM tool_usages WHERE conversation_id IN (SELECT id FROM conversations WHERE user_id = ?)",
+                (user_id,)
+            )
+            self._conn.execute("DELETE FROM conversations WHERE user_id = ?", (user_id,))
+            self._conn.execute("DELETE FROM users WHERE id = ?", (user_id,))
+            self._conn.execute("COMMIT")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def status(self) -> Dict:
+        return {"backend": "sqlite", "path": self.path}
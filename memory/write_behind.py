@@ -0,0 +1,113 @@
+from typing import Any, Callable, List, Optional
+import asyncio
+import queue
+import threading
+import time
+
+
+class _FlushRequest:
+    def __init__(self):
+        self.done = threading.Event()
+
+
+_STOP = object()
+
+
+class WriteBehindQueue:
+    """
+    Buffers records and hands them to a writer callback in batches from a
+    background thread. A batch is written when it reaches batch_size or when
+    flush_interval seconds have passed since its first record. The queue is
+    bounded, so producers block once max_pending records are waiting.
+    A batch that still fails after max_retries attempts is passed to
+    on_failure(batch, error) if given, and dropped otherwise.
+    """
+
+    def __init__(self, write_batch: Callable[[List[Any]], None], batch_size: int = 100,
+                 flush_interval: float = 1.0, max_pending: int = 10000, max_retries: int = 3,
+                 on_failure: Optional[Callable[[List[Any], Exception], None]] = None,
+                 name: str = "write-behind"):
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.on_failure = on_failure
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+
+    def put(self, item: Any):
+        """Enqueue a record, blocking while the queue is full."""
+        if self._closed:
+            raise RuntimeError("Write-behind queue is closed")
+        self._queue.put(item)
+
+    async def aput(self, item: Any):
+        """Enqueue without blocking the event loop unless the queue is full."""
+        if self._closed:
+            raise RuntimeError("Write-behind queue is closed")
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            await asyncio.to_thread(self._queue.put, item)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything enqueued so far has been written."""
+        if self._closed:
+            return True
+        request = _FlushRequest()
+        self._queue.put(request)
+        return request.done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = None):
+        """Write out remaining records and stop the background thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._worker.join(timeout)
+
+    def _write(self, batch: List[Any]):
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                self.write_batch(batch)
+                return
+            except Exception as e:
+                if attempt < self.max_retries:
+                    time.sleep(min(0.1 * 2 ** attempt, 2.0))
+                elif self.on_failure is not None:
+                    try:
+                        self.on_failure(batch, e)
+                    except Exception as failure:
+                        print(f"Warning: Dropping {len(batch)} buffered writes, failure handler raised: {failure}")
+                else:
+                    print(f"Warning: Dropping {len(batch)} buffered writes after {attempt} attempts: {e}")
+
+    def _run(self):
+        batch: List[Any] = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._write(batch)
+                batch, deadline = [], None
+                continue
+
+            if item is _STOP or isinstance(item, _FlushRequest):
+                if batch:
+                    self._write(batch)
+                batch, deadline = [], None
+                if item is _STOP:
+                    return
+                item.done.set()
+                continue
+
+            batch.append(item)
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch, deadline = [], None
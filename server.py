@@ -0,0 +1,226 @@
+"""
+Long-running multi-user server for the agent.
+
+Speaks newline-delimited JSON over TCP. Each request line is an object with
+a message and a user_id, plus an optional id echoed back on every reply:
+
+    {"id": 1, "user_id": "alice", "message": "What is the capital of Peru?"}
+    {"id": 2, "user_id": "alice", "command": "history"}
+
+Replies stream back as token, tool_start, tool_end and final events (or a
+single result/error object for commands). Requests on one connection run
+concurrently and can be told apart by id; tool events carry the model's
+tool call id as tool_call_id.
+
+    python server.py [--host 127.0.0.1] [--port 8765] [--max-concurrency 32]
+"""
+from typing import Any, Dict, Optional
+import argparse
+import asyncio
+import json
+import os
+import signal
+import time
+
+from agent import VacationArithmeticAgent
+from utils.metrics import metrics, start_metrics_server
+
+MAX_LINE_BYTES = 1024 * 1024
+
+
+class ThreadLocks:
+    """One asyncio.Lock per thread id, dropped again once nobody holds or waits for it."""
+
+    def __init__(self):
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._users: Dict[str, int] = {}
+
+    async def acquire(self, thread_id: str):
+        lock = self._locks.setdefault(thread_id, asyncio.Lock())
+        self._users[thread_id] = self._users.get(thread_id, 0) + 1
+        try:
+            await lock.acquire()
+        except BaseException:
+            self._release_user(thread_id)
+            raise
+
+    def release(self, thread_id: str):
+        self._locks[thread_id].release()
+        self._release_user(thread_id)
+
+    def _release_user(self, thread_id: str):
+        self._users[thread_id] -= 1
+        if not self._users[thread_id]:
+            del self._users[thread_id]
+            del self._locks[thread_id]
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+
+class AgentServer:
+    """
+    Serves one shared VacationArithmeticAgent (and with it one graph, LLM
+    client, tool connection pools, caches and Neo4j driver) to every client.
+    Turns for the same user_id run one at a time, in arrival order, so a
+    thread's checkpoint is never written by two turns at once; across users
+    at most max_concurrency turns are in flight.
+    """
+
+    def __init__(self, agent: VacationArithmeticAgent, max_concurrency: int = 32):
+        self.agent = agent
+        self.max_concurrency = max_concurrency
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._thread_locks = ThreadLocks()
+        self._tasks = set()
+        self._in_flight = 0
+        self._server: Optional[asyncio.Server] = None
+
+    async def start(self, host: str, port: int):
+        self._server = await asyncio.start_server(self._handle_connection, host, port, limit=MAX_LINE_BYTES)
+        return self._server
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._server is not None:
+            # Idle keep-alive connections would otherwise hold wait_closed open
+            self._server.close_clients()
+            await self._server.wait_closed()
+        await self.agent.aclose()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        write_lock = asyncio.Lock()
+        requests = set()
+
+        async def send(payload: Dict[str, Any]):
+            async with write_lock:
+                writer.write(json.dumps(payload, default=str).encode() + b"\n")
+                await writer.drain()
+
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError):
+                    await send({"type": "error", "error": f"Request exceeds {MAX_LINE_BYTES} bytes"})
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                task = asyncio.create_task(self._handle_line(line, send))
+                requests.add(task)
+                self._tasks.add(task)
+                task.add_done_callback(requests.discard)
+                task.add_done_callback(self._tasks.discard)
+            if requests:
+                await asyncio.gather(*requests, return_exceptions=True)
+        except ConnectionError:
+            pass
+        finally:
+            for task in requests:
+                task.cancel()
+            writer.close()
+
+    async def _handle_line(self, line: bytes, send):
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Request must be a JSON object")
+        except ValueError as e:
+            await send({"type": "error", "error": f"Invalid request: {e}"})
+            return
+
+        request_id = request.get("id")
+        user_id = str(request.get("user_id") or "default_user")
+        try:
+            if request.get("command"):
+                result = await self._run_command(request["command"], user_id)
+                await send({"id": request_id, "type": "result", "result": result})
+            elif isinstance(request.get("message"), str) and request["message"].strip():
+                async for event in self._run_turn(request["message"].strip(), user_id):
+                    await send({**event, "id": request_id})
+            else:
+                await send({"id": request_id, "type": "error", "error": "Request needs a message or a command"})
+        except ConnectionError:
+            raise
+        except Exception as e:
+            await send({"id": request_id, "type": "error", "error": str(e)})
+
+    async def _run_turn(self, message: str, user_id: str):
+        await self._thread_locks.acquire(user_id)
+        try:
+            async with self._slots:
+                self._in_flight += 1
+                try:
+                    async for event in self.agent.astream_response(message, user_id):
+                        yield event
+                finally:
+                    self._in_flight -= 1
+        finally:
+            self._thread_locks.release(user_id)
+
+    async def _run_command(self, command: str, user_id: str) -> Any:
+        if command == "history":
+            history = await asyncio.to_thread(self.agent.get_conversation_history, user_id)
+            return [item if isinstance(item, dict) else {"role": item.type, "content": item.content}
+                    for item in history]
+        if command == "stats":
+            return await asyncio.to_thread(self.agent.get_conversation_stats, user_id)
+        if command == "server_stats":
+            return self.stats()
+        if command == "metrics":
+            return self.agent.get_metrics()
+        raise ValueError(f"Unknown command: {command}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self._in_flight,
+            "active_threads": len(self._thread_locks),
+            "open_requests": len(self._tasks),
+        }
+
+
+async def serve(host: str, port: int, max_concurrency: int):
+    started = time.perf_counter()
+    agent = VacationArithmeticAgent()
+    server = AgentServer(agent, max_concurrency=max_concurrency)
+    await server.start(host, port)
+    metrics.observe("startup_seconds", time.perf_counter() - started, phase="ready")
+    print(f"Agent server listening on {host}:{port} (max {max_concurrency} concurrent turns)")
+    # Accept connections right away and build the model client and graph meanwhile
+    warm_up = asyncio.create_task(asyncio.to_thread(agent.warm_up))
+    if os.getenv('METRICS_PORT'):
+        start_metrics_server(int(os.getenv('METRICS_PORT')), host=host)
+        print(f"Metrics at http://{host}:{os.getenv('METRICS_PORT')}/metrics")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass
+    try:
+        await stop.wait()
+    finally:
+        print("Shutting down, waiting for in-flight turns...")
+        await asyncio.gather(warm_up, return_exceptions=True)
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv('AGENT_SERVER_HOST', '127.0.0.1'))
+    parser.add_argument("--port", type=int, default=int(os.getenv('AGENT_SERVER_PORT', '8765')))
+    parser.add_argument("--max-concurrency", type=int, default=int(os.getenv('AGENT_MAX_CONCURRENCY', '32')))
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port, args.max_concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import pytest
+
+from tools.country_index import CountryIndex, load_country_index, normalize_name
+
+
+@pytest.fixture(scope="module")
+def index():
+    return load_country_index()
+
+
+def test_normalize_name():
+    assert normalize_name("U.S.A.") == "usa"
+    assert normalize_name("  The Bahamas ") == "bahamas"
+    assert normalize_name("Côte d'Ivoire") == "cote divoire"
+
+
+@pytest.mark.parametrize("name, common", [
+    ("usa", "United States"),
+    ("Deutschland", "Germany"),
+    ("DEU", "Germany"),
+    ("Swaziland", "Eswatini"),
+    ("Czech Republic", "Czechia"),
+    ("Ivory Coast", "Côte d'Ivoire"),
+    ("East Timor", "Timor-Leste"),
+    ("Cape Verde", "Cabo Verde"),
+    ("Turkey", "Türkiye"),
+    ("Germny", "Germany"),
+])
+def test_lookup_accepts_codes_aliases_and_typos(index, name, common):
+    assert index.lookup(name)["name"]["common"] == common
+
+
+def test_lookup_misses(index):
+    assert index.lookup("Atlantis") is None
+    assert index.lookup("Germny", fuzzy=False) is None
+
+
+def test_snapshot_is_current(index):
+    assert index.lookup("Kazakhstan")["capital"] == ["Astana"]
+    assert list(index.lookup("Croatia")["currencies"]) == ["EUR"]
+    assert list(index.lookup("Bulgaria")["currencies"]) == ["EUR"]
+    assert index.lookup("Serbia and Montenegro") is None
+
+
+def test_snapshot_records_are_well_formed(index):
+    assert len({country["cca2"] for country in index.countries}) == len(index) == 250
+    for country in index.countries:
+        assert all(isinstance(capital, str) for capital in country["capital"])
+        for code, currency in country["currencies"].items():
+            # Currency names are spelled out, not repeated ISO codes
+            assert currency["name"] and currency["name"] != code
+
+
+def test_common_names_win_over_aliases():
+    countries = [
+        {"name": {"common": "Niger", "official": "Republic of the Niger"}, "cca2": "NE", "cca3": "NER",
+         "altSpellings": []},
+        {"name": {"common": "Nigeria", "official": "Federal Republic of Nigeria"}, "cca2": "NG", "cca3": "NGA",
+         "altSpellings": ["Niger"]},
+    ]
+    assert CountryIndex(countries).lookup("Niger")["cca2"] == "NE"
@@ -0,0 +1,136 @@
+import time
+
+import pytest
+from pydantic import ValidationError
+
+from tools.arithmetic_tool import ArithmeticInput, ArithmeticTool
+from tools.expression import DEFAULT_LIMITS, evaluate_batch, evaluate_expression
+
+
+@pytest.fixture(params=["numpy", "python"])
+def batch_backend(request, monkeypatch):
+    """Run a test against the NumPy path and the row-by-row fallback."""
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        import builtins
+        real_import = builtins.__import__
+
+        def no_numpy(name, *args, **kwargs):
+            if name == "numpy":
+                raise ImportError(name)
+            return real_import(name, *args, **kwargs)
+        monkeypatch.setattr(builtins, "__import__", no_numpy)
+    return request.param
+
+
+def test_batch_broadcasts_length_one_arrays(batch_backend):
+    assert evaluate_batch("budget * rate", {"budget": [1000, 2500, 4000], "rate": [0.5]}) == [500.0, 1250.0, 2000.0]
+
+
+def test_batch_reports_bad_rows_as_none(batch_backend):
+    results = evaluate_batch("a / b + c ** 0.5", {"a": [1, 1, 1e308], "b": [2, 0, 1e-308], "c": [4, 4, -4]})
+    assert results == [2.5, None, None]
+
+
+def test_batch_rejects_mismatched_or_empty_arrays():
+    with pytest.raises(ValueError, match="same length"):
+        evaluate_batch("a + b", {"a": [1, 2], "b": [1, 2, 3]})
+    with pytest.raises(ValueError, match="empty"):
+        evaluate_batch("a", {"a": []})
+    with pytest.raises(ValueError, match="Too many rows"):
+        evaluate_batch("a", {"a": [1] * (DEFAULT_LIMITS.max_batch_rows + 1)})
+
+
+@pytest.mark.parametrize("name", ["__deadline__", "__class__", "1x", "a-b", "lambda", ""])
+def test_batch_rejects_reserved_and_invalid_names(batch_backend, name):
+    with pytest.raises(ValueError, match="Invalid variable name"):
+        evaluate_batch("a", {"a": [1.0], name: [1.0]})
+
+
+def test_batch_variables_cannot_override_the_time_budget(batch_backend):
+    limits = DEFAULT_LIMITS._replace(time_budget=1e-9)
+    with pytest.raises(TimeoutError):
+        evaluate_batch("a * 2", {"a": [1.0, 2.0]}, limits)
+    with pytest.raises(ValueError, match="Invalid variable name"):
+        evaluate_batch("a * 2", {"a": [1.0, 2.0], "__deadline__": [1e18]}, limits)
+
+
+def test_tool_input_validates_variable_names():
+    assert ArithmeticInput(expression="a", variables={"a": [1.0]}).variables == {"a": [1.0]}
+    with pytest.raises(ValidationError, match="Invalid variable name"):
+        ArithmeticInput(expression="a", variables={"__deadline__": [1e18]})
+
+
+def test_tool_batch_output():
+    output = ArithmeticTool().evaluate_batch_expression("a / b", {"a": [1, 2], "b": [2, 0]})
+    assert output.splitlines() == [
+        "Results of 'a / b' for 2 rows:",
+        "1. a=1, b=2 -> 0.5",
+        "2. a=2, b=0 -> error (division by zero, overflow or complex result)",
+    ]
+    assert ArithmeticTool().evaluate_batch_expression("__deadline__", {"__deadline__": [1.0]}).startswith(
+        "Invalid batch calculation: Invalid variable name")
+
+
+def balanced_sum(leaves: int) -> str:
+    """A shallow expression with `leaves` operands, to hit the node limit before the depth limit."""
+    if leaves == 1:
+        return "1"
+    return f"({balanced_sum(leaves // 2)}+{balanced_sum(leaves - leaves // 2)})"
+
+
+@pytest.mark.parametrize("expression", ["9**9**9**9", "9**9**9", "2**4097", "(2**3000)*(2**3000)", "2**2048*2**2048"])
+def test_huge_integer_results_are_rejected_quickly(expression):
+    start = time.perf_counter()
+    assert evaluate_expression(expression) == (
+        f"Invalid mathematical expression: Result is too large (more than {DEFAULT_LIMITS.max_result_bits} bits)")
+    assert time.perf_counter() - start < 0.5
+
+
+def test_large_results_within_the_bit_limit_are_computed():
+    assert evaluate_expression("2**2000") == 2 ** 2000
+    assert evaluate_expression("(2**2000)*(2**2000)") == 2 ** 4000
+
+
+@pytest.mark.parametrize("expression", ["1e308+1e308", "-1e308-1e308", "1e308*10", "1e308/1e-308", "10.0**400",
+                                        "2**1024*1.0", "2**1024+0.5", "(1e200*1e200)-1"])
+def test_float_overflow_is_reported_for_every_operator(expression):
+    assert evaluate_expression(expression) == "Invalid mathematical expression: Result is too large"
+
+
+@pytest.mark.parametrize("a, b, operation", [(1e308, 1e308, "add"), (-1e308, 1e308, "subtract"),
+                                             (1e308, 10, "multiply"), (1e308, 1e-308, "divide"),
+                                             (10.0, 400, "power")])
+def test_basic_operations_report_float_overflow(a, b, operation):
+    assert ArithmeticTool().calculate_basic_operation(a, b, operation) == "Error: Result is too large"
+
+
+def test_node_limit():
+    limit = DEFAULT_LIMITS.max_nodes
+    assert evaluate_expression(balanced_sum(64)) == 64
+    assert evaluate_expression(balanced_sum(limit), DEFAULT_LIMITS._replace(max_length=10_000)) == (
+        f"Invalid mathematical expression: Expression is too complex (more than {limit} elements)")
+
+
+def test_depth_limit():
+    limit = DEFAULT_LIMITS.max_depth
+    assert evaluate_expression("-" * 50 + "1") == 1
+    assert evaluate_expression("-" * limit + "1") == (
+        f"Invalid mathematical expression: Expression is nested too deeply (more than {limit} levels)")
+
+
+def test_length_limit():
+    assert evaluate_expression("1+" * 600 + "1") == (
+        f"Invalid mathematical expression: Expression is too long (more than {DEFAULT_LIMITS.max_length} characters)")
+
+
+def test_time_budget():
+    assert evaluate_expression("2*3+4", DEFAULT_LIMITS._replace(time_budget=1e-9)) == (
+        "Invalid mathematical expression: Evaluation exceeded its time budget")
+    assert evaluate_expression("2*3+4", DEFAULT_LIMITS._replace(time_budget=5.0)) == 10
+
+
+@pytest.mark.parametrize("expression", ["__import__('os')", "().__class__", "abs(-1)", "x", "[1, 2]", "1 if 1 else 2"])
+def test_only_arithmetic_is_evaluated(expression):
+    assert str(evaluate_expression(expression)).startswith("Invalid mathematical expression")
@@ -0,0 +1,73 @@
+import pytest
+
+from tools.arithmetic_tool import ArithmeticTool
+from tools.fast_path import FastPathRouter
+from tools.vacation_tool import VacationTool
+
+
+@pytest.fixture
+def router(monkeypatch):
+    monkeypatch.delenv("VACATION_OFFLINE_INDEX", raising=False)
+    monkeypatch.delenv("VACATION_OFFLINE_ONLY", raising=False)
+    return FastPathRouter(ArithmeticTool(), VacationTool())
+
+
+@pytest.mark.parametrize("text, answer", [
+    ("2+2", "4"),
+    ("what is 3*(4-1)?", "9"),
+    ("Calculate 10 / 4", "2.5"),
+    ("2^10 =", "1024"),
+    ("100-1", "99"),
+    ("12/4/2", "1.5"),
+])
+def test_arithmetic_is_answered_directly(router, text, answer):
+    routed = router.route(text)
+    assert routed.route == "arithmetic"
+    assert routed.tool_name == "arithmetic_calculator"
+    assert answer in routed.answer
+
+
+@pytest.mark.parametrize("text", [
+    "2024-10-17",
+    "10/17/2024",
+    "17-10-24",
+    "555-1234",
+    "555 555-1234",
+    "(555) 555-1234",
+    "+1 555-1234",
+    "what is 2024-10-17?",
+    "1/0",
+    "42",
+    "what is the weather like?",
+])
+def test_dates_phone_numbers_and_other_text_go_to_the_model(router, text):
+    assert router.route(text) is None
+
+
+def test_greeting(router):
+    assert router.route("Hello there!").route == "greeting"
+    assert router.route("hello, what is 2+2?") is None
+
+
+def test_country_questions_use_the_index_by_default(router):
+    routed = router.route("What is the capital of Kazakhstan?")
+    assert routed.route == "country"
+    assert routed.answer == "The capital of Kazakhstan is Astana."
+    assert routed.tool_input == {"location": "Kazakhstan"}
+
+    assert "Euro (EUR)" in router.route("currency of Croatia").answer
+    # Fuzzy matches are left to the model
+    assert router.route("capital of Kazakstan") is None
+
+
+def test_country_route_is_off_without_the_index(monkeypatch):
+    monkeypatch.setenv("VACATION_OFFLINE_INDEX", "false")
+    router = FastPathRouter(ArithmeticTool(), VacationTool())
+    assert router.route("capital of France") is None
+
+
+def test_stats(router):
+    router.route("2+2")
+    router.route("hi")
+    router.route("tell me a joke")
+    assert router.stats() == {"hits": {"arithmetic": 1, "greeting": 1}, "misses": 1, "hit_rate": 2 / 3}
@@ -0,0 +1,124 @@
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, SystemMessage, ToolMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from agent import VacationArithmeticAgent, add_messages
+from benchmarks.fakes import InMemoryConversationStore, ScriptedChatModel
+from memory.history import HistoryWindow
+
+
+def ids(messages):
+    return [m.id for m in messages]
+
+
+def tool_turn(n: int):
+    """One user turn with a tool call: question, tool call, tool result, answer."""
+    return [
+        HumanMessage(content=f"question {n}", id=f"h{n}"),
+        AIMessage(content="", id=f"call{n}",
+                  tool_calls=[{"name": "arithmetic_calculator", "args": {"expression": "1+1"}, "id": f"tc{n}"}]),
+        ToolMessage(content="2", tool_call_id=f"tc{n}", id=f"tool{n}"),
+        AIMessage(content=f"answer {n}", id=f"a{n}"),
+    ]
+
+
+def assert_no_orphaned_tool_messages(messages):
+    calls = set()
+    for message in messages:
+        if isinstance(message, AIMessage):
+            calls.update(call["id"] for call in message.tool_calls)
+        elif isinstance(message, ToolMessage):
+            assert message.tool_call_id in calls, f"{message.id} lost its tool call"
+
+
+def test_add_messages_appends_and_assigns_ids():
+    history = add_messages(None, HumanMessage(content="hi"))
+    assert len(history) == 1 and history[0].id
+
+    same = add_messages(history, [AIMessage(content="hello", id="a1"), HumanMessage(content="bye", id="h2")])
+    assert same is history
+    assert [m.content for m in history] == ["hi", "hello", "bye"]
+
+
+def test_add_messages_replaces_by_id_in_place():
+    history = add_messages([], [HumanMessage(content="q", id="h1"), AIMessage(content="draft", id="a1"),
+                                HumanMessage(content="next", id="h2")])
+    add_messages(history, AIMessage(content="final", id="a1"))
+    assert ids(history) == ["h1", "a1", "h2"]
+    assert history[1].content == "final"
+
+
+def test_add_messages_removes_by_id():
+    history = add_messages([], tool_turn(1) + tool_turn(2))
+    removals = [RemoveMessage(id=message_id) for message_id in ("h1", "call1", "tool1", "a1")]
+    add_messages(history, removals + [HumanMessage(content="q3", id="h3")])
+    assert ids(history) == ["h2", "call2", "tool2", "a2", "h3"]
+
+
+def test_add_messages_ignores_unknown_removals():
+    history = add_messages([], tool_turn(1))
+    add_messages(history, [RemoveMessage(id="missing")])
+    assert ids(history) == ["h1", "call1", "tool1", "a1"]
+
+
+def test_add_messages_is_idempotent():
+    history = add_messages([], [HumanMessage(content="q", id="h1")])
+    update = [RemoveMessage(id="h1"), AIMessage(content="answer", id="a1")]
+    add_messages(history, update)
+    add_messages(history, update)
+    assert ids(history) == ["a1"]
+
+
+def test_add_messages_keeps_one_leading_system_message():
+    history = add_messages([], [HumanMessage(content="q", id="h1")])
+    add_messages(history, SystemMessage(content="first"))
+    add_messages(history, SystemMessage(content="second"))
+    assert [type(m) for m in history] == [SystemMessage, HumanMessage]
+    assert history[0].content == "second"
+
+
+def test_window_keeps_everything_under_the_limits():
+    history = tool_turn(1) + tool_turn(2)
+    assert HistoryWindow(max_messages=8, max_tokens=10_000).split(history) == (history, [])
+    assert HistoryWindow().split(history) == (history, [])
+
+
+def test_window_trims_to_a_user_turn():
+    history = [SystemMessage(content="prompt", id="s")] + tool_turn(1) + tool_turn(2) + tool_turn(3)
+    for limit in range(1, 12):
+        kept, evicted = HistoryWindow(max_messages=limit).split(history)
+        assert isinstance(kept[0], HumanMessage)
+        assert not any(isinstance(m, SystemMessage) for m in kept + evicted)
+        assert ids(evicted + kept) == ids(history[1:])
+        assert_no_orphaned_tool_messages(kept)
+        assert len(kept) <= max(limit, 4)
+
+
+def test_window_keeps_the_whole_current_turn_when_it_alone_exceeds_the_limit():
+    history = tool_turn(1) + tool_turn(2)
+    kept, evicted = HistoryWindow(max_messages=2).split(history)
+    assert ids(kept) == ["h2", "call2", "tool2", "a2"]
+    assert ids(evicted) == ["h1", "call1", "tool1", "a1"]
+
+
+def test_window_token_budget():
+    history = [HumanMessage(content="x" * 400, id="long"), AIMessage(content="ok", id="a0")] + tool_turn(1)
+    kept, evicted = HistoryWindow(max_tokens=60).split(history)
+    assert ids(evicted) == ["long", "a0"]
+    assert ids(kept) == ["h1", "call1", "tool1", "a1"]
+
+
+def test_trimmed_threads_never_orphan_tool_results():
+    agent = VacationArithmeticAgent(max_history_messages=5, llm=ScriptedChatModel(),
+                                    neo4j_memory=InMemoryConversationStore(), checkpointer=MemorySaver(),
+                                    fast_path=False, llm_cache=None)
+    try:
+        for n in range(6):
+            agent.run(f"Please work out {n} + {n * 2}", "trim-user")
+            messages = agent.graph.get_state({"configurable": {"thread_id": "trim-user"}}).values["messages"]
+            assert isinstance(messages[0], HumanMessage)
+            assert_no_orphaned_tool_messages(messages)
+            # The latest turn is always complete: question, tool call, tool result, answer
+            assert [type(m) for m in messages[-4:]] == [HumanMessage, AIMessage, ToolMessage, AIMessage]
+        assert len(messages) <= 8
+    finally:
+        agent.close()
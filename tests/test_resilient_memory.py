@@ -0,0 +1,147 @@
+import pytest
+
+from memory.base import conversation_row
+from memory.resilient_memory import ResilientMemory
+from memory.sqlite_memory import SQLiteMemory
+
+USAGE = {"tool_name": "arithmetic_calculator", "input_data": '{"expression": "2+2"}', "output_data": "4"}
+
+
+class FlakyPrimary(SQLiteMemory):
+    """Stands in for Neo4jMemory: a SQLite store that refuses connections while down."""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.up = True
+        self.on_write_failure = None
+
+    def _check(self):
+        if not self.up:
+            raise ConnectionRefusedError("primary is down")
+
+    def health_check(self) -> bool:
+        return self.up
+
+    def write_records(self, records):
+        self._check()
+        super().write_records(records)
+
+    def get_conversation_page(self, *args):
+        self._check()
+        return super().get_conversation_page(*args)
+
+    def get_conversation_stats(self, user_id):
+        self._check()
+        return super().get_conversation_stats(user_id)
+
+    def flush(self):
+        pass
+
+
+@pytest.fixture
+def spool(tmp_path):
+    spool = SQLiteMemory(str(tmp_path / "spool.sqlite"))
+    yield spool
+    spool.close()
+
+
+@pytest.fixture
+def memory(tmp_path):
+    primary = FlakyPrimary(str(tmp_path / "primary.sqlite"))
+    memory = ResilientMemory(primary, SQLiteMemory(str(tmp_path / "spool.sqlite")), retry_interval=3600)
+    yield memory
+    memory.close()
+
+
+def spool_conversations(spool, count):
+    rows = [conversation_row("u1", f"question {i}", f"answer {i}", tool_usages=[USAGE]) for i in range(count)]
+    spool.write_records([("conversation", row) for row in rows])
+    return rows
+
+
+def test_replay_hands_over_records_with_nested_usages(spool, tmp_path):
+    rows = spool_conversations(spool, 5)
+    target = SQLiteMemory(str(tmp_path / "target.sqlite"))
+    try:
+        assert spool.replay(target.write_records, batch_size=2) == 10
+        assert spool.pending_count() == 0
+        history = target.get_conversation_history("u1", limit=10)
+        assert sorted(record["id"] for record in history) == sorted(row["id"] for row in rows)
+        assert target.get_conversation_stats("u1") == {
+            "conversation_count": 5, "most_used_tool": "arithmetic_calculator", "total_tool_uses": 5}
+        assert spool.replay(target.write_records) == 0
+    finally:
+        target.close()
+
+
+def test_replay_is_idempotent_when_a_batch_is_written_twice(spool, tmp_path):
+    spool_conversations(spool, 3)
+    target = SQLiteMemory(str(tmp_path / "target.sqlite"))
+    calls = []
+
+    def write_then_fail(records):
+        # The write lands but the spool never hears back, so the batch stays spooled
+        target.write_records(records)
+        calls.append(len(records))
+        if len(calls) == 1:
+            raise ConnectionResetError("connection lost after write")
+
+    try:
+        with pytest.raises(ConnectionResetError):
+            spool.replay(write_then_fail)
+        assert spool.pending_count() == 6
+
+        assert spool.replay(write_then_fail) == 6
+        assert spool.pending_count() == 0
+        assert target.get_conversation_stats("u1") == {
+            "conversation_count": 3, "most_used_tool": "arithmetic_calculator", "total_tool_uses": 3}
+    finally:
+        target.close()
+
+
+def test_replay_sends_usages_whose_conversation_was_already_written(spool, tmp_path):
+    row = conversation_row("u1", "question", "answer")
+    spool.store_tool_usage(row["id"], "vacation_finder", '{"location": "Peru"}', "Lima")
+    target = SQLiteMemory(str(tmp_path / "target.sqlite"))
+    try:
+        target.write_records([("conversation", row)])
+        assert spool.replay(target.write_records) == 1
+        assert target.get_conversation_stats("u1")["most_used_tool"] == "vacation_finder"
+    finally:
+        target.close()
+
+
+def test_writes_are_spooled_while_primary_is_down_and_replayed_once(memory):
+    memory.primary.up = False
+    conversation_id = memory.store_conversation("u1", "What is 2+2?", "4", tool_usages=[USAGE])
+    assert not memory.available
+    assert memory.status()["spooled_records"] == 2
+    # Reads fall back to the spool
+    assert [record["id"] for record in memory.get_conversation_history("u1")] == [conversation_id]
+
+    assert memory.recover() is False
+    memory.primary.up = True
+    assert memory.recover() is True
+    assert memory.available
+    assert memory.status()["spooled_records"] == 0
+
+    assert memory.recover() is True
+    assert [record["id"] for record in memory.get_conversation_history("u1")] == [conversation_id]
+    assert memory.get_conversation_stats("u1") == {
+        "conversation_count": 1, "most_used_tool": "arithmetic_calculator", "total_tool_uses": 1}
+
+
+def test_writes_go_straight_to_primary_while_it_is_up(memory):
+    conversation_id = memory.store_conversation("u1", "hi", "hello", conversation_id="turn-1")
+    assert conversation_id == "turn-1"
+    assert memory.status()["spooled_records"] == 0
+    assert [record["id"] for record in memory.primary.get_conversation_history("u1")] == ["turn-1"]
+
+
+def test_failed_write_behind_batch_lands_in_spool(memory):
+    row = conversation_row("u1", "question", "answer")
+    memory.primary.on_write_failure([("conversation", row)], ConnectionRefusedError("down"))
+    assert not memory.available
+    assert memory.status()["spooled_records"] == 1
+    assert memory.recover() is True
+    assert [record["id"] for record in memory.primary.get_conversation_history("u1")] == [row["id"]]
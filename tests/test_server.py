@@ -0,0 +1,65 @@
+import asyncio
+import json
+
+from langgraph.checkpoint.memory import MemorySaver
+
+from agent import VacationArithmeticAgent
+from benchmarks.fakes import InMemoryConversationStore, ScriptedChatModel
+from server import AgentServer
+
+
+def make_agent():
+    return VacationArithmeticAgent(llm=ScriptedChatModel(latency=0.01), neo4j_memory=InMemoryConversationStore(),
+                                   checkpointer=MemorySaver(), fast_path=False, llm_cache=None)
+
+
+async def exchange(requests):
+    """Send requests on one connection and collect replies until each got its final event."""
+    server = AgentServer(make_agent())
+    await server.start("127.0.0.1", 0)
+    port = server._server.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        writer.write(b"".join(json.dumps(request).encode() + b"\n" for request in requests))
+        await writer.drain()
+        replies, finals = [], 0
+        while finals < len(requests):
+            reply = json.loads(await asyncio.wait_for(reader.readline(), timeout=10))
+            replies.append(reply)
+            finals += reply["type"] in ("final", "error", "result")
+        return replies
+    finally:
+        writer.close()
+        await server.close()
+
+
+def test_tool_events_carry_the_request_id():
+    replies = asyncio.run(exchange([
+        {"id": 1, "user_id": "alice", "message": "What is 2 + 3?"},
+        {"id": "b", "user_id": "bob", "message": "What is 7 * 6?"},
+    ]))
+
+    by_request = {}
+    for reply in replies:
+        by_request.setdefault(reply["id"], []).append(reply)
+    assert set(by_request) == {1, "b"}
+
+    for request_id, expression, result in ((1, "2 + 3", "5"), ("b", "7 * 6", "42")):
+        events = by_request[request_id]
+        starts = [event for event in events if event["type"] == "tool_start"]
+        ends = [event for event in events if event["type"] == "tool_end"]
+        assert [event["args"] for event in starts] == [{"expression": expression}]
+        assert [event["tool_call_id"] for event in ends] == [starts[0]["tool_call_id"]]
+        assert starts[0]["tool_call_id"].startswith("call_")
+        assert result in ends[0]["output"]
+        assert events[-1]["type"] == "final"
+
+
+def test_command_and_invalid_request_replies():
+    replies = asyncio.run(exchange([
+        {"id": 1, "user_id": "alice", "command": "server_stats"},
+        {"id": 2, "user_id": "alice"},
+    ]))
+    by_id = {reply["id"]: reply for reply in replies}
+    assert by_id[1]["type"] == "result" and by_id[1]["result"]["max_concurrency"] == 32
+    assert by_id[2] == {"id": 2, "type": "error", "error": "Request needs a message or a command"}
@@ -0,0 +1,180 @@
+import time
+
+import pytest
+from langgraph.checkpoint.base import create_checkpoint, empty_checkpoint
+
+from memory.sqlite_checkpointer import SQLiteCheckpointSaver
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "checkpoints.sqlite")
+
+
+def open_saver(path, **kwargs):
+    # No automatic flushes, so the tests decide when rows reach SQLite
+    kwargs.setdefault("batch_size", 10_000)
+    kwargs.setdefault("flush_interval", 3600)
+    return SQLiteCheckpointSaver(path, **kwargs)
+
+
+def config(thread_id, checkpoint_id=None):
+    configurable = {"thread_id": thread_id, "checkpoint_ns": ""}
+    if checkpoint_id:
+        configurable["checkpoint_id"] = checkpoint_id
+    return {"configurable": configurable}
+
+
+def put_step(saver, parent_config, values, step):
+    """Put a checkpoint holding values as the child of parent_config."""
+    parent = saver.get_tuple(parent_config) if "checkpoint_id" in parent_config["configurable"] else None
+    base = parent.checkpoint if parent else empty_checkpoint()
+    checkpoint = create_checkpoint(base, None, step)
+    versions = {}
+    for channel, value in values.items():
+        versions[channel] = saver.get_next_version(base["channel_versions"].get(channel), None)
+        checkpoint["channel_values"][channel] = value
+    checkpoint["channel_versions"] = {**base["channel_versions"], **versions}
+    return saver.put(parent_config, checkpoint, {"source": "loop", "step": step}, versions)
+
+
+def test_round_trip_through_flush(db_path):
+    saver = open_saver(db_path)
+    first = put_step(saver, config("t1"), {"messages": ["hi"], "count": 1}, step=0)
+    second = put_step(saver, first, {"count": 2}, step=1)
+    saver.put_writes(second, [("messages", "pending"), ("count", 3)], task_id="task-1")
+
+    # Nothing was flushed yet: a second connection sees an empty file
+    other = open_saver(db_path)
+    assert other.get_tuple(config("t1")) is None
+    other.close()
+
+    saver.flush()
+    reopened = open_saver(db_path)
+    try:
+        latest = reopened.get_tuple(config("t1"))
+        assert latest.config["configurable"]["checkpoint_id"] == second["configurable"]["checkpoint_id"]
+        assert latest.checkpoint["channel_values"] == {"messages": ["hi"], "count": 2}
+        assert latest.metadata["step"] == 1
+        assert latest.parent_config == first
+        assert latest.pending_writes == [("task-1", "messages", "pending"), ("task-1", "count", 3)]
+
+        earlier = reopened.get_tuple(first)
+        assert earlier.checkpoint["channel_values"] == {"messages": ["hi"], "count": 1}
+        assert earlier.parent_config is None
+
+        listed = list(reopened.list(config("t1")))
+        assert [item.config["configurable"]["checkpoint_id"] for item in listed] == [
+            second["configurable"]["checkpoint_id"], first["configurable"]["checkpoint_id"]]
+        assert [item.metadata["step"] for item in reopened.list(config("t1"), filter={"step": 0})] == [0]
+        assert len(list(reopened.list(config("t1"), before=second))) == 1
+        assert len(list(reopened.list(config("t1"), limit=1))) == 1
+    finally:
+        reopened.close()
+        saver.close()
+
+
+def test_get_tuple_sees_buffered_writes(db_path):
+    saver = open_saver(db_path)
+    try:
+        put_step(saver, config("t1"), {"count": 1}, step=0)
+        assert saver.get_tuple(config("t1")).checkpoint["channel_values"] == {"count": 1}
+        assert len(list(saver.list(config("t1")))) == 1
+    finally:
+        saver.close()
+
+
+def test_close_flushes_buffered_checkpoints(db_path):
+    saver = open_saver(db_path)
+    put_step(saver, config("t1"), {"count": 1}, step=0)
+    saver.close()
+
+    reopened = open_saver(db_path)
+    try:
+        assert reopened.get_tuple(config("t1")).checkpoint["channel_values"] == {"count": 1}
+    finally:
+        reopened.close()
+
+
+def test_cache_serves_repeated_reads(db_path, monkeypatch):
+    saver = open_saver(db_path)
+    try:
+        put_step(saver, config("t1"), {"count": 1}, step=0)
+        saver.flush()
+        loads = []
+        original = saver._load_entry
+        monkeypatch.setattr(saver, "_load_entry", lambda *args: loads.append(args) or original(*args))
+
+        for _ in range(3):
+            assert saver.get_tuple(config("t1")).checkpoint["channel_values"] == {"count": 1}
+        assert loads == []
+    finally:
+        saver.close()
+
+
+def test_cache_picks_up_writes_from_another_connection(db_path):
+    reader = open_saver(db_path)
+    writer = open_saver(db_path)
+    try:
+        first = put_step(writer, config("t1"), {"count": 1}, step=0)
+        writer.flush()
+        assert reader.get_tuple(config("t1")).checkpoint["channel_values"] == {"count": 1}
+
+        second = put_step(writer, first, {"count": 2}, step=1)
+        writer.flush()
+        latest = reader.get_tuple(config("t1"))
+        assert latest.config["configurable"]["checkpoint_id"] == second["configurable"]["checkpoint_id"]
+        assert latest.checkpoint["channel_values"] == {"count": 2}
+    finally:
+        writer.close()
+        reader.close()
+
+
+def test_cache_is_bounded(db_path):
+    saver = open_saver(db_path, cache_size=2)
+    try:
+        for thread_id in ("a", "b", "c"):
+            put_step(saver, config(thread_id), {"count": 1}, step=0)
+        assert [key[0] for key in saver._cache] == ["b", "c"]
+        assert saver.get_tuple(config("a")).checkpoint["channel_values"] == {"count": 1}
+    finally:
+        saver.close()
+
+
+def test_idle_threads_expire_after_ttl(db_path, monkeypatch):
+    saver = open_saver(db_path, ttl_seconds=60)
+    try:
+        put_step(saver, config("idle"), {"count": 1}, step=0)
+        saver.flush()
+        now = time.time()
+        monkeypatch.setattr(time, "time", lambda: now + 120)
+        put_step(saver, config("active"), {"count": 1}, step=0)
+
+        assert saver.evict_idle_threads() == 1
+        assert saver.get_tuple(config("idle")) is None
+        assert list(saver.list(config("idle"))) == []
+        assert saver.get_tuple(config("active")) is not None
+    finally:
+        saver.close()
+
+
+def test_no_eviction_without_ttl(db_path):
+    saver = open_saver(db_path)
+    try:
+        put_step(saver, config("t1"), {"count": 1}, step=0)
+        assert saver.evict_idle_threads() == 0
+        assert saver.get_tuple(config("t1")) is not None
+    finally:
+        saver.close()
+
+
+def test_delete_thread(db_path):
+    saver = open_saver(db_path)
+    try:
+        put_step(saver, config("t1"), {"count": 1}, step=0)
+        put_step(saver, config("t2"), {"count": 1}, step=0)
+        saver.delete_thread("t1")
+        assert saver.get_tuple(config("t1")) is None
+        assert saver.get_tuple(config("t2")) is not None
+    finally:
+        saver.close()
@@ -0,0 +1,126 @@
+import asyncio
+import threading
+
+import pytest
+
+from benchmarks.fakes import StubCountriesServer
+from tools.vacation_tool import VacationTool
+
+
+@pytest.fixture
+def stub():
+    with StubCountriesServer(latency=0.2) as stub:
+        yield stub
+
+
+@pytest.fixture
+def tool(stub):
+    VacationTool._cache.clear()
+    yield VacationTool(base_url=stub.url, use_offline_index=False)
+    VacationTool._cache.clear()
+
+
+def test_concurrent_lookups_share_one_request(tool, stub):
+    results = []
+    barrier = threading.Barrier(8)
+
+    def lookup():
+        barrier.wait()
+        results.append(tool.fetch_country_data("France"))
+
+    threads = [threading.Thread(target=lookup) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert stub.requests == 1
+    assert [result["capital"] for result in results] == [["Paris"]] * 8
+
+
+def test_results_are_cached(tool, stub):
+    assert tool.fetch_country_data("japan")["capital"] == ["Tokyo"]
+    assert tool.fetch_country_data(" Japan ")["capital"] == ["Tokyo"]
+    assert "error" in tool.fetch_country_data("Atlantis")
+    assert "error" in tool.fetch_country_data("Atlantis")
+    assert stub.requests == 2
+
+
+def test_async_concurrent_lookups_share_one_request(tool, stub):
+    async def run():
+        try:
+            return await asyncio.gather(*(tool.afetch_country_data("Peru") for _ in range(8)))
+        finally:
+            await VacationTool.aclose_async_client()
+
+    results = asyncio.run(run())
+    assert stub.requests == 1
+    assert [result["capital"] for result in results] == [["Lima"]] * 8
+
+
+def test_cancelled_leader_does_not_fail_waiting_callers(tool, stub):
+    async def run():
+        try:
+            leader = asyncio.create_task(tool.afetch_country_data("Chile"))
+            await asyncio.sleep(0.05)
+            followers = [asyncio.create_task(tool.afetch_country_data("Chile")) for _ in range(3)]
+            await asyncio.sleep(0.05)
+            leader.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await leader
+            return await asyncio.gather(*followers)
+        finally:
+            await VacationTool.aclose_async_client()
+
+    results = asyncio.run(run())
+    assert [result["capital"] for result in results] == [["Santiago"]] * 3
+    # The cancelled leader's request, then one request by the follower that took over
+    assert stub.requests == 2
+
+
+def test_cancelled_follower_leaves_the_leader_running(tool, stub):
+    async def run():
+        try:
+            leader = asyncio.create_task(tool.afetch_country_data("Kenya"))
+            await asyncio.sleep(0.05)
+            follower = asyncio.create_task(tool.afetch_country_data("Kenya"))
+            await asyncio.sleep(0.05)
+            follower.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await follower
+            return await leader
+        finally:
+            await VacationTool.aclose_async_client()
+
+    assert asyncio.run(run())["capital"] == ["Nairobi"]
+    assert stub.requests == 1
+
+
+def test_async_client_is_closed_per_loop(tool):
+    async def run():
+        client = VacationTool.get_async_client()
+        assert VacationTool.get_async_client() is client
+        await VacationTool.aclose_async_client()
+        assert client.is_closed
+        assert asyncio.get_running_loop() not in VacationTool._async_clients
+        # Closing again, or without a client, is a no-op
+        await VacationTool.aclose_async_client()
+
+    asyncio.run(run())
+
+
+def test_agent_aclose_closes_the_async_client():
+    from langgraph.checkpoint.memory import MemorySaver
+
+    from agent import VacationArithmeticAgent
+    from benchmarks.fakes import InMemoryConversationStore, ScriptedChatModel
+
+    agent = VacationArithmeticAgent(llm=ScriptedChatModel(), neo4j_memory=InMemoryConversationStore(),
+                                    checkpointer=MemorySaver(), llm_cache=None)
+
+    async def run():
+        client = VacationTool.get_async_client()
+        await agent.aclose()
+        return client
+
+    assert asyncio.run(run()).is_closed
@@ -0,0 +1,110 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from memory.write_behind import WriteBehindQueue
+
+
+class Recorder:
+    def __init__(self, failures: int = 0):
+        self.batches = []
+        self.failures = failures
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, batch):
+        with self._lock:
+            self.calls += 1
+            if self.calls <= self.failures:
+                raise ConnectionError("database unavailable")
+            self.batches.append(list(batch))
+
+    @property
+    def records(self):
+        return [record for batch in self.batches for record in batch]
+
+
+def test_close_flushes_pending_records():
+    writer = Recorder()
+    queue = WriteBehindQueue(writer, batch_size=1000, flush_interval=3600)
+    for i in range(25):
+        queue.put(i)
+    assert writer.batches == []
+
+    queue.close()
+    assert writer.records == list(range(25))
+    assert len(writer.batches) == 1
+
+
+def test_batches_are_cut_at_batch_size():
+    writer = Recorder()
+    queue = WriteBehindQueue(writer, batch_size=10, flush_interval=3600)
+    for i in range(25):
+        queue.put(i)
+    queue.close()
+    assert [len(batch) for batch in writer.batches] == [10, 10, 5]
+    assert writer.records == list(range(25))
+
+
+def test_flush_waits_for_records_enqueued_so_far():
+    writer = Recorder()
+    queue = WriteBehindQueue(writer, batch_size=1000, flush_interval=3600)
+    try:
+        queue.put("a")
+        queue.put("b")
+        assert queue.flush(timeout=5)
+        assert writer.records == ["a", "b"]
+    finally:
+        queue.close()
+
+
+def test_partial_batch_is_written_after_flush_interval():
+    writer = Recorder()
+    queue = WriteBehindQueue(writer, batch_size=1000, flush_interval=0.05)
+    try:
+        queue.put("a")
+        for _ in range(100):
+            if writer.records:
+                break
+            time.sleep(0.01)
+        assert writer.records == ["a"]
+    finally:
+        queue.close()
+
+
+def test_failed_batch_is_retried():
+    writer = Recorder(failures=1)
+    queue = WriteBehindQueue(writer, batch_size=1000, flush_interval=3600, max_retries=3)
+    queue.put("a")
+    queue.close()
+    assert writer.calls == 2
+    assert writer.records == ["a"]
+
+
+def test_batch_goes_to_on_failure_after_max_retries():
+    writer = Recorder(failures=10)
+    failed = []
+    queue = WriteBehindQueue(writer, batch_size=1000, flush_interval=3600, max_retries=2,
+                             on_failure=lambda batch, error: failed.append((list(batch), error)))
+    queue.put("a")
+    queue.put("b")
+    queue.close()
+    assert writer.calls == 2
+    assert [batch for batch, _ in failed] == [["a", "b"]]
+    assert isinstance(failed[0][1], ConnectionError)
+
+
+def test_aput_and_put_after_close():
+    writer = Recorder()
+    queue = WriteBehindQueue(writer, batch_size=1000, flush_interval=3600)
+    asyncio.run(queue.aput("a"))
+    queue.close()
+    assert writer.records == ["a"]
+
+    with pytest.raises(RuntimeError):
+        queue.put("b")
+    with pytest.raises(RuntimeError):
+        asyncio.run(queue.aput("b"))
+    assert queue.flush() is True
@@ -1,7 +1,10 @@
-from typing import Any, Dict, Type, Optional, Union, ClassVar
-from langchain.tools import BaseTool
-from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Type, Optional, Union, ClassVar
+from langchain_core.tools import BaseTool
+from pydantic import BaseModel, Field, field_validator
+from tools.expression import (DEFAULT_LIMITS, EvaluationLimits, check_variable_name, evaluate_batch,
+                             evaluate_expression, guarded_pow)
 import ast
+import math
 import operator
 
 class ArithmeticInput(BaseModel):
@@ -9,11 +12,23 @@ class ArithmeticInput(BaseModel):
     b: Optional[float] = Field(None, description="Second number")
     operation: Optional[str] = Field(None, description="Operation: add, subtract, multiply, divide, power")
     expression: Optional[str] = Field(None, description="Mathematical expression to evaluate (e.g., '2+3*4-5/2')")
+    variables: Optional[Dict[str, List[float]]] = Field(None, description="Batch mode: named value arrays used by the expression, e.g. expression 'budget * rate' with {'budget': [1000, 2500, 4000], 'rate': [0.92]}. Arrays of length 1 apply to every row; all results come back in one call")
+
+    @field_validator('variables')
+    @classmethod
+    def check_variable_names(cls, variables: Optional[Dict[str, List[float]]]) -> Optional[Dict[str, List[float]]]:
+        for name in variables or {}:
+            check_variable_name(name)
+        return variables
 
 class ArithmeticTool(BaseTool):
     name: str = "arithmetic_calculator"
-    description: str = "Performs arithmetic operations. Use either: 1) Individual operations with a, b, operation parameters or 2) Complete expressions with expression parameter"
+    description: str = "Performs arithmetic operations. Use either: 1) Individual operations with a, b, operation parameters, 2) Complete expressions with expression parameter or 3) The same expression over many values with expression and variables parameters"
     args_schema: Type[BaseModel] = ArithmeticInput
+    # Guarded mode bounds expression size, nesting and result magnitude so a
+    # hostile expression returns an error instead of pinning the worker
+    guarded: bool = True
+    limits: EvaluationLimits = DEFAULT_LIMITS
 
     operators: ClassVar[Dict] = {
         ast.Add: operator.add,
@@ -25,32 +40,42 @@ class ArithmeticTool(BaseTool):
         ast.UAdd: operator.pos,
     }
 
+    basic_operations: ClassVar[Dict] = {
+        'add': lambda x, y: x + y,
+        'subtract': lambda x, y: x - y,
+        'multiply': lambda x, y: x * y,
+        'divide': lambda x, y: x / y if y != 0 else "Error: Division by zero",
+        'power': lambda x, y: x ** y,
+        'mod': lambda x, y: x % y if y != 0 else "Error: Modulo by zero"
+    }
+
     def _run(self, **kwargs) -> str:
         if kwargs.get('a') is not None and kwargs.get('b') is not None and kwargs.get('operation'):
             return self.calculate_basic_operation(**kwargs)
+        elif kwargs.get('expression') and kwargs.get('variables'):
+            return self.evaluate_batch_expression(kwargs['expression'], kwargs['variables'])
         elif kwargs.get('expression'):
             return self.evaluate_expression(kwargs['expression'])
         else:
             return "Please provide either (a, b, operation) for individual operations or (expression) for complex calculations"
 
     def calculate_basic_operation(self, a: float, b: float, operation: str, **kwargs) -> str:
-        operations = {
-            'add': lambda x, y: x + y,
-            'subtract': lambda x, y: x - y,
-            'multiply': lambda x, y: x * y,
-            'divide': lambda x, y: x / y if y != 0 else "Error: Division by zero",
-            'power': lambda x, y: x ** y,
-            'mod': lambda x, y: x % y if y != 0 else "Error: Modulo by zero"
-        }
-
-        op_func = operations.get(operation.lower())
+        op_func = self.basic_operations.get(operation.lower())
         if not op_func:
-            available_ops = ', '.join(operations.keys())
+            available_ops = ', '.join(self.basic_operations.keys())
             return f"Unknown operation '{operation}'. Available operations: {available_ops}"
 
-        result = op_func(a, b)
+        if self.guarded and operation.lower() == 'power':
+            op_func = guarded_pow(self.limits.max_result_bits)
+
+        try:
+            result = op_func(a, b)
+        except (ValueError, ArithmeticError) as e:
+            return f"Error: {e}"
         if isinstance(result, str):
             return result
+        if self.guarded and isinstance(result, float) and math.isinf(result):
+            return "Error: Result is too large"
 
         return f"The result of {a} {operation} {b} is {result}"
 
@@ -61,14 +86,31 @@ class ArithmeticTool(BaseTool):
             return result
         return f"The result of '{expression}' is {result}"
 
-    def parse_mathematical_expression(self, expression: str) -> Union[int, float, str]:
+    def evaluate_batch_expression(self, expression: str, variables: Dict[str, List[float]]) -> str:
+        expression = expression.strip()
         try:
-            node = ast.parse(expression, mode='eval')
-            return self.evaluate_ast_node(node.body)
-        except (SyntaxError, ValueError) as e:
-            return f"Invalid mathematical expression: {e}"
+            results = evaluate_batch(expression, variables, self.limits if self.guarded else None)
+        except (SyntaxError, ValueError, ArithmeticError, TimeoutError) as e:
+            return f"Invalid batch calculation: {e}"
+
+        lines = [f"Results of '{expression}' for {len(results)} rows:"]
+        for row, result in enumerate(results):
+            inputs = ', '.join(
+                f"{name}={values[0] if len(values) == 1 else values[row]}" for name, values in variables.items()
+            )
+            value = result if result is not None else "error (division by zero, overflow or complex result)"
+            lines.append(f"{row + 1}. {inputs} -> {value}")
+        return '\n'.join(lines)
+
+    def parse_mathematical_expression(self, expression: str) -> Union[int, float, str]:
+        # Compiled once per expression and memoized, see tools/expression.py
+        return evaluate_expression(expression, self.limits if self.guarded else None)
 
     def evaluate_ast_node(self, node) -> Union[int, float]:
+        """
+        Reference tree-walking evaluator, kept for comparison in
+        benchmarks/arithmetic_bench.py.
+        """
         if isinstance(node, ast.Constant):
             return node.value
 
@@ -0,0 +1,128 @@
+from typing import Dict, Iterable, List, Optional
+from functools import lru_cache
+from pathlib import Path
+import difflib
+import json
+import re
+import unicodedata
+
+SNAPSHOT_PATH = Path(__file__).parent / "data" / "countries.json"
+SNAPSHOT_FIELDS = "name,capital,currencies,region,altSpellings,cca2,cca3,translations"
+
+
+def normalize_name(name: str) -> str:
+    """Case, accent and punctuation insensitive form of a country name ("U.S.A." -> "usa")."""
+    name = unicodedata.normalize('NFKD', name)
+    name = ''.join(c for c in name if not unicodedata.combining(c)).casefold()
+    name = re.sub(r"[.'’]", '', name)
+    name = re.sub(r"[^\w]+", ' ', name).strip()
+    if name.startswith('the '):
+        name = name[4:]
+    return name
+
+
+class CountryIndex:
+    """
+    In-memory index over a snapshot of country records in REST Countries format.
+    Exact lookups accept common and official names, ISO codes and alternative or
+    native spellings; anything else falls back to fuzzy matching.
+    """
+
+    def __init__(self, countries: List[Dict], fuzzy_cutoff: float = 0.82):
+        self.countries = countries
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self._by_name: Dict[str, Dict] = {}
+        # Earlier passes win, so a common name is never shadowed by someone's alias
+        for names in (self._common_names, self._official_names, self._codes, self._aliases):
+            for country in countries:
+                for name in names(country):
+                    key = normalize_name(name)
+                    if key:
+                        self._by_name.setdefault(key, country)
+        self._names = list(self._by_name)
+        self._fuzzy_lookup = lru_cache(maxsize=1024)(self._fuzzy_match)
+
+    @staticmethod
+    def _common_names(country: Dict) -> Iterable[str]:
+        return [country.get('name', {}).get('common', '')]
+
+    @staticmethod
+    def _official_names(country: Dict) -> Iterable[str]:
+        return [country.get('name', {}).get('official', '')]
+
+    @staticmethod
+    def _codes(country: Dict) -> Iterable[str]:
+        return [country.get('cca2', ''), country.get('cca3', '')]
+
+    @staticmethod
+    def _aliases(country: Dict) -> Iterable[str]:
+        return country.get('altSpellings', [])
+
+    def _fuzzy_match(self, key: str) -> Optional[str]:
+        matches = difflib.get_close_matches(key, self._names, n=1, cutoff=self.fuzzy_cutoff)
+        return matches[0] if matches else None
+
+    def lookup(self, name: str, fuzzy: bool = True) -> Optional[Dict]:
+        key = normalize_name(name)
+        country = self._by_name.get(key)
+        if country is not None or not fuzzy or len(key) < 4:
+            return country
+        match = self._fuzzy_lookup(key)
+        return self._by_name[match] if match else None
+
+    def __len__(self) -> int:
+        return len(self.countries)
+
+    @classmethod
+    def from_file(cls, path: Path = SNAPSHOT_PATH) -> "CountryIndex":
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+
+@lru_cache(maxsize=1)
+def load_country_index() -> CountryIndex:
+    """Load the bundled snapshot once per process."""
+    return CountryIndex.from_file()
+
+
+def compact_country(record: Dict) -> Dict:
+    """Reduce a full REST Countries record to the fields kept in the snapshot."""
+    aliases = set(record.get('altSpellings', []))
+    for native in record.get('name', {}).get('nativeName', {}).values():
+        aliases.update(filter(None, [native.get('common'), native.get('official')]))
+    for translation in record.get('translations', {}).values():
+        aliases.update(filter(None, [translation.get('common')]))
+    aliases.discard(record.get('name', {}).get('common'))
+
+    return {
+        'name': {
+            'common': record.get('name', {}).get('common', ''),
+            'official': record.get('name', {}).get('official', ''),
+        },
+        'capital': record.get('capital', []),
+        'region': record.get('region', ''),
+        'currencies': record.get('currencies', {}),
+        'cca2': record.get('cca2', ''),
+        'cca3': record.get('cca3', ''),
+        'altSpellings': sorted(aliases),
+    }
+
+
+def refresh_snapshot(base_url: str = "https://restcountries.com/v3.1", path: Path = SNAPSHOT_PATH) -> int:
+    """Rebuild the bundled snapshot from the REST Countries API; returns the number of countries."""
+    import requests
+
+    response = requests.get(f"{base_url}/all?fields={SNAPSHOT_FIELDS}", timeout=30)
+    response.raise_for_status()
+    countries = sorted((compact_country(r) for r in response.json()), key=lambda c: c['name']['common'])
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(countries, f, ensure_ascii=False, separators=(',', ':'))
+    load_country_index.cache_clear()
+    return len(countries)
+
+
+if __name__ == "__main__":
+    import sys
+
+    url = sys.argv[1] if len(sys.argv) > 1 else "https://restcountries.com/v3.1"
+    print(f"Saved {refresh_snapshot(url)} countries to {SNAPSHOT_PATH}")
@@ -0,0 +1,155 @@
+from typing import Any, Dict, List, Optional, Sequence
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from weakref import WeakKeyDictionary
+import asyncio
+import threading
+import time
+
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool
+
+from utils.metrics import metrics
+
+INVALID_TOOL_MESSAGE = "Error: {name} is not a valid tool, try one of [{available}]."
+TOOL_ERROR_MESSAGE = "Error: {error}\n Please fix your mistakes."
+TIMEOUT_MESSAGE = "Error: {name} did not finish within {timeout:g} seconds."
+
+
+class ParallelToolExecutor:
+    """
+    Graph node that runs every tool call of the last AIMessage concurrently
+    and returns one ToolMessage per call, in the order the model issued them.
+    Sync invocations share a bounded thread pool; async invocations gather
+    coroutines on the running loop. concurrency_limits caps how many calls of
+    a given tool run at once, and timeouts (seconds, per tool name) bound
+    each call including time spent waiting for a slot. A failed or timed out
+    call becomes an error ToolMessage so the model can react to it instead of
+    the whole step failing. Each ToolMessage carries the call's duration in
+    seconds, including any wait for a slot, as response_metadata["duration"].
+    """
+
+    def __init__(self, tools: Sequence[BaseTool], max_workers: int = 8,
+                 concurrency_limits: Optional[Dict[str, int]] = None,
+                 timeouts: Optional[Dict[str, float]] = None, default_timeout: Optional[float] = 30.0):
+        self.tools_by_name = {tool.name: tool for tool in tools}
+        self.concurrency_limits = dict(concurrency_limits or {})
+        self.timeouts = dict(timeouts or {})
+        self.default_timeout = default_timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool-call")
+        self._semaphores = {name: threading.BoundedSemaphore(limit)
+                            for name, limit in self.concurrency_limits.items()}
+        self._async_semaphores: "WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = WeakKeyDictionary()
+        self._async_lock = threading.Lock()
+
+    def timeout_for(self, name: str) -> Optional[float]:
+        return self.timeouts.get(name, self.default_timeout)
+
+    @staticmethod
+    def tool_calls(state: Dict[str, Any]) -> List[Dict[str, Any]]:
+        messages = state["messages"]
+        last_message = messages[-1] if messages else None
+        if not isinstance(last_message, AIMessage):
+            return []
+        return list(last_message.tool_calls)
+
+    def _tool_message(self, call: Dict[str, Any], content: Any, status: str = "success",
+                      duration: float = 0.0) -> ToolMessage:
+        return ToolMessage(content=content if isinstance(content, str) else str(content),
+                           name=call["name"], tool_call_id=call["id"], status=status,
+                           response_metadata={"duration": duration})
+
+    def _lookup(self, call: Dict[str, Any]) -> Optional[BaseTool]:
+        return self.tools_by_name.get(call["name"])
+
+    def _invalid_tool(self, call: Dict[str, Any]) -> ToolMessage:
+        metrics.increment("tool_call_invalid_total", tool=call["name"])
+        available = ", ".join(self.tools_by_name)
+        return self._tool_message(call, INVALID_TOOL_MESSAGE.format(name=call["name"], available=available), "error")
+
+    def _timed_out(self, call: Dict[str, Any]) -> ToolMessage:
+        metrics.increment("tool_call_timeouts_total", tool=call["name"])
+        timeout = self.timeout_for(call["name"])
+        return self._tool_message(call, TIMEOUT_MESSAGE.format(name=call["name"], timeout=timeout), "error", timeout)
+
+    def _run_one(self, tool: BaseTool, call: Dict[str, Any], config: Optional[RunnableConfig]) -> ToolMessage:
+        semaphore = self._semaphores.get(call["name"])
+        start = time.perf_counter()
+        if semaphore is not None:
+            semaphore.acquire()
+        try:
+            with metrics.timer("tool_call", tool=call["name"]):
+                output = tool.invoke(call["args"], config)
+            return self._tool_message(call, output, duration=time.perf_counter() - start)
+        except Exception as e:
+            return self._tool_message(call, TOOL_ERROR_MESSAGE.format(error=repr(e)), "error",
+                                      time.perf_counter() - start)
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+
+    @metrics.timed("graph_node", node="tools")
+    def invoke(self, state: Dict[str, Any], config: Optional[RunnableConfig] = None) -> Dict[str, List[ToolMessage]]:
+        pending = [(call, self._submit(call, config)) for call in self.tool_calls(state)]
+        start = time.monotonic()
+        messages = []
+        for call, future in pending:
+            if isinstance(future, ToolMessage):
+                messages.append(future)
+                continue
+            timeout = self.timeout_for(call["name"])
+            remaining = None if timeout is None else max(start + timeout - time.monotonic(), 0)
+            try:
+                messages.append(future.result(timeout=remaining))
+            except FutureTimeoutError:
+                # The worker thread cannot be interrupted; its result is discarded
+                future.cancel()
+                messages.append(self._timed_out(call))
+        return {"messages": messages}
+
+    def _submit(self, call: Dict[str, Any], config: Optional[RunnableConfig]):
+        tool = self._lookup(call)
+        if tool is None:
+            return self._invalid_tool(call)
+        return self._pool.submit(self._run_one, tool, call, config)
+
+    def _loop_semaphores(self) -> Dict[str, asyncio.Semaphore]:
+        loop = asyncio.get_running_loop()
+        with self._async_lock:
+            semaphores = self._async_semaphores.get(loop)
+            if semaphores is None:
+                semaphores = {name: asyncio.Semaphore(limit) for name, limit in self.concurrency_limits.items()}
+                self._async_semaphores[loop] = semaphores
+            return semaphores
+
+    async def _ainvoke_tool(self, tool: BaseTool, call: Dict[str, Any], config: Optional[RunnableConfig]):
+        semaphore = self._loop_semaphores().get(call["name"])
+        if semaphore is None:
+            with metrics.timer("tool_call", tool=call["name"]):
+                return await tool.ainvoke(call["args"], config)
+        async with semaphore:
+            with metrics.timer("tool_call", tool=call["name"]):
+                return await tool.ainvoke(call["args"], config)
+
+    async def _arun_one(self, call: Dict[str, Any], config: Optional[RunnableConfig]) -> ToolMessage:
+        tool = self._lookup(call)
+        if tool is None:
+            return self._invalid_tool(call)
+        start = time.perf_counter()
+        try:
+            output = await asyncio.wait_for(self._ainvoke_tool(tool, call, config), self.timeout_for(call["name"]))
+        except asyncio.TimeoutError:
+            return self._timed_out(call)
+        except Exception as e:
+            return self._tool_message(call, TOOL_ERROR_MESSAGE.format(error=repr(e)), "error",
+                                      time.perf_counter() - start)
+        return self._tool_message(call, output, duration=time.perf_counter() - start)
+
+    @metrics.timed("graph_node", node="tools")
+    async def ainvoke(self, state: Dict[str, Any], config: Optional[RunnableConfig] = None) -> Dict[str, List[ToolMessage]]:
+        calls = self.tool_calls(state)
+        messages = await asyncio.gather(*(self._arun_one(call, config) for call in calls))
+        return {"messages": list(messages)}
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
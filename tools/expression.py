@@ -0,0 +1,263 @@
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Union
+from functools import lru_cache
+import ast
+import keyword
+import math
+import operator
+import time
+
+Number = Union[int, float]
+Evaluator = Callable[[Dict[str, Any]], Any]
+
+BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.Pow: operator.pow,
+}
+
+UNARY_OPERATORS = {
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+}
+
+# Reserved key in the evaluation environment holding the time budget deadline
+DEADLINE_KEY = '__deadline__'
+
+
+class EvaluationLimits(NamedTuple):
+    """
+    Bounds applied to untrusted expressions before and during evaluation.
+    Integer results are capped by bit length, so `9**9**9**9` is rejected
+    before Python starts computing it.
+    """
+    max_length: int = 1000
+    max_nodes: int = 256
+    max_depth: int = 100
+    max_result_bits: int = 4096
+    time_budget: Optional[float] = None
+    max_batch_rows: int = 10000
+
+
+DEFAULT_LIMITS = EvaluationLimits()
+
+
+def _check_complexity(tree: ast.AST, limits: EvaluationLimits):
+    nodes = 0
+    stack = [(tree, 1)]
+    while stack:
+        node, depth = stack.pop()
+        nodes += 1
+        if nodes > limits.max_nodes:
+            raise ValueError(f"Expression is too complex (more than {limits.max_nodes} elements)")
+        if depth > limits.max_depth:
+            raise ValueError(f"Expression is nested too deeply (more than {limits.max_depth} levels)")
+        stack.extend((child, depth + 1) for child in ast.iter_child_nodes(node) if isinstance(child, ast.expr))
+
+
+def guarded_pow(max_bits: int):
+    def power(base, exponent):
+        if (isinstance(base, int) and isinstance(exponent, int)
+                and exponent > 0 and abs(base) > 1
+                and exponent * base.bit_length() > max_bits):
+            raise ValueError(f"Result is too large (more than {max_bits} bits)")
+        try:
+            return base ** exponent
+        except OverflowError:
+            raise ValueError("Result is too large")
+    return power
+
+
+def guarded_mul(max_bits: int):
+    def multiply(left, right):
+        if (isinstance(left, int) and isinstance(right, int)
+                and left.bit_length() + right.bit_length() > max_bits):
+            raise ValueError(f"Result is too large (more than {max_bits} bits)")
+        return left * right
+    return multiply
+
+
+def _finite(evaluate: Evaluator) -> Evaluator:
+    # Float arithmetic overflows to inf instead of raising, and mixing in a huge int
+    # raises OverflowError; arrays report overflow per row
+    def checked(env):
+        try:
+            result = evaluate(env)
+        except OverflowError:
+            raise ValueError("Result is too large")
+        if isinstance(result, float) and math.isinf(result):
+            raise ValueError("Result is too large")
+        return result
+    return checked
+
+
+def _with_deadline(evaluate: Evaluator) -> Evaluator:
+    def checked(env):
+        deadline = env.get(DEADLINE_KEY)
+        if deadline is not None and time.monotonic() > deadline:
+            raise TimeoutError("Evaluation exceeded its time budget")
+        return evaluate(env)
+    return checked
+
+
+def _divide(left: Evaluator, right: Evaluator) -> Evaluator:
+    def evaluate(env):
+        numerator = left(env)
+        denominator = right(env)
+        # Arrays divide element-wise; zeros become inf/nan and are reported per row
+        if isinstance(denominator, (int, float, complex)) and denominator == 0:
+            raise ValueError("Division by zero")
+        return numerator / denominator
+    return evaluate
+
+
+def check_variable_name(name: str) -> str:
+    """Reject names that are not plain identifiers; dunder names are reserved for the evaluator."""
+    if not isinstance(name, str) or not name.isidentifier() or keyword.iskeyword(name) or name.startswith('__'):
+        raise ValueError(f"Invalid variable name: {name}")
+    return name
+
+
+def _variable(name: str) -> Evaluator:
+    check_variable_name(name)
+
+    def evaluate(env):
+        try:
+            return env[name]
+        except KeyError:
+            raise ValueError(f"Unknown variable: {name}")
+    return evaluate
+
+
+def _compile_node(node: ast.AST, limits: Optional[EvaluationLimits]) -> Evaluator:
+    if isinstance(node, ast.Constant):
+        value = node.value
+        if not isinstance(value, (int, float, complex)):
+            raise ValueError(f"Unsupported constant: {value!r}")
+        return lambda env: value
+
+    if isinstance(node, ast.Name):
+        return _variable(node.id)
+
+    if isinstance(node, ast.BinOp):
+        op_func = BINARY_OPERATORS.get(type(node.op))
+        if not op_func:
+            raise ValueError(f"Unsupported operation: {type(node.op).__name__}")
+        if limits is not None and isinstance(node.op, ast.Pow):
+            op_func = guarded_pow(limits.max_result_bits)
+        elif limits is not None and isinstance(node.op, ast.Mult):
+            op_func = guarded_mul(limits.max_result_bits)
+
+        left = _compile_node(node.left, limits)
+        right = _compile_node(node.right, limits)
+        if isinstance(node.op, ast.Div):
+            evaluate = _divide(left, right)
+        else:
+            evaluate = lambda env: op_func(left(env), right(env))
+
+        if limits is not None:
+            evaluate = _finite(evaluate)
+        if limits is not None and limits.time_budget is not None:
+            evaluate = _with_deadline(evaluate)
+        return evaluate
+
+    if isinstance(node, ast.UnaryOp):
+        op_func = UNARY_OPERATORS.get(type(node.op))
+        if not op_func:
+            raise ValueError(f"Unsupported unary operation: {type(node.op).__name__}")
+        operand = _compile_node(node.operand, limits)
+        return lambda env: op_func(operand(env))
+
+    raise ValueError(f"Unsupported node type: {type(node).__name__}")
+
+
+@lru_cache(maxsize=1024)
+def compile_expression(expression: str, limits: Optional[EvaluationLimits] = DEFAULT_LIMITS) -> Evaluator:
+    """
+    Validate an expression once and turn it into a tree of closures.
+    The result is called with a mapping of variable names to values (scalars
+    or NumPy arrays).
+    Raises SyntaxError or ValueError for anything outside plain arithmetic or
+    beyond the given limits; pass limits=None to evaluate unguarded.
+    """
+    expression = expression.strip()
+    if limits is not None and len(expression) > limits.max_length:
+        raise ValueError(f"Expression is too long (more than {limits.max_length} characters)")
+
+    tree = ast.parse(expression, mode='eval')
+    if limits is not None:
+        _check_complexity(tree.body, limits)
+    return _compile_node(tree.body, limits)
+
+
+@lru_cache(maxsize=4096)
+def _evaluate_memoized(expression: str, limits: Optional[EvaluationLimits]) -> Number:
+    env = {}
+    if limits is not None and limits.time_budget is not None:
+        env[DEADLINE_KEY] = time.monotonic() + limits.time_budget
+    return compile_expression(expression, limits)(env)
+
+
+def evaluate_expression(expression: str, limits: Optional[EvaluationLimits] = DEFAULT_LIMITS) -> Union[Number, str]:
+    """Evaluate an arithmetic expression, memoizing successful results per expression."""
+    try:
+        return _evaluate_memoized(expression, limits)
+    except (SyntaxError, ValueError, ArithmeticError, TimeoutError, MemoryError, RecursionError) as e:
+        return f"Invalid mathematical expression: {e}"
+
+
+def evaluate_batch(expression: str, variables: Dict[str, Sequence[float]],
+                   limits: Optional[EvaluationLimits] = DEFAULT_LIMITS) -> List[Optional[float]]:
+    """
+    Evaluate one expression over rows of named values in a single pass.
+    Every array must have the same length, or length 1 to apply to all rows.
+    Uses NumPy vectorization when available and a row-by-row loop otherwise;
+    rows that divide by zero, overflow or have a complex result (e.g. a
+    fractional power of a negative number) come back as None.
+    """
+    for name in variables:
+        check_variable_name(name)
+    lengths = {len(values) for values in variables.values()}
+    if 0 in lengths:
+        raise ValueError("Variable arrays must not be empty")
+    row_counts = lengths - {1}
+    if len(row_counts) > 1:
+        raise ValueError("All variable arrays must have the same length (or length 1)")
+    rows = row_counts.pop() if row_counts else 1
+    if limits is not None and rows > limits.max_batch_rows:
+        raise ValueError(f"Too many rows (more than {limits.max_batch_rows})")
+
+    evaluate = compile_expression(expression, limits)
+    env = {}
+    if limits is not None and limits.time_budget is not None:
+        env[DEADLINE_KEY] = time.monotonic() + limits.time_budget
+
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+
+    if np is not None:
+        env.update({name: np.asarray(values, dtype=float) for name, values in variables.items()})
+        with np.errstate(all='ignore'):
+            result = np.asarray(evaluate(env))
+            if np.iscomplexobj(result):
+                # Casting to float would silently drop the imaginary part
+                result = np.where(result.imag == 0, result.real, np.nan)
+            result = np.broadcast_to(result.astype(float), (rows,))
+        return [float(value) if np.isfinite(value) else None for value in result]
+
+    results = []
+    for row in range(rows):
+        env.update({name: float(values[0] if len(values) == 1 else values[row])
+                    for name, values in variables.items()})
+        try:
+            value = evaluate(env)
+        except (ValueError, ArithmeticError, TypeError):
+            results.append(None)
+            continue
+        if isinstance(value, complex):
+            value = value.real if value.imag == 0 else math.nan
+        results.append(float(value) if math.isfinite(value) else None)
+    return results
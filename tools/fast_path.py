@@ -0,0 +1,142 @@
+from typing import Dict, NamedTuple, Optional
+from collections import Counter
+import re
+import threading
+import time
+
+from tools.arithmetic_tool import ArithmeticTool
+from tools.country_index import load_country_index
+from tools.vacation_tool import VacationTool
+
+GREETING_RESPONSE = ("Hello! I can help with arithmetic calculations and country information "
+                     "such as capitals, currencies and regions. What would you like to know?")
+
+GREETING_PATTERN = re.compile(
+    r"^(hi|hello|hey|hiya|howdy|greetings|good (morning|afternoon|evening))( there)?[\s!.,]*$",
+    re.IGNORECASE,
+)
+ARITHMETIC_PREFIX = re.compile(r"^(what is|what's|whats|calculate|compute|evaluate|solve)\s+", re.IGNORECASE)
+ARITHMETIC_PATTERN = re.compile(r"^[\d\s.+\-*/()]+$")
+HAS_OPERATOR = re.compile(r"[\d)]\s*(\*\*|[-+*/])\s*[-+(\d.]")
+# Dates and phone numbers parse as arithmetic ("2024-10-17" -> 1997) but are not meant as such
+NOT_ARITHMETIC_PATTERN = re.compile(
+    r"^(\d{4}-\d{1,2}-\d{1,2}"                           # 2024-10-17
+    r"|\d{1,2}([/-])\d{1,2}\2\d{2,4}"                    # 10/17/2024, 17-10-24
+    r"|(\+?\d{1,3}[\s-])?(\(\d{3}\)\s*|\d{3}[\s-])?\d{3}-\d{4})$"  # 555-1234, (555) 555-1234
+)
+COUNTRY_QUESTION = re.compile(
+    r"^(?:what(?:'s| is)\s+)?(?:the\s+)?(?P<field>capital|currency)(?:\s+city)?\s+(?:of|in|for|used in)\s+"
+    r"(?P<country>[^?!.]+?)\s*[?!.]*$",
+    re.IGNORECASE,
+)
+
+# Tools whose work a route stands in for, so its answers count as tool usage
+ROUTE_TOOLS = {"arithmetic": "arithmetic_calculator", "country": "vacation_finder"}
+
+
+class FastPathAnswer(NamedTuple):
+    route: str
+    answer: str
+    tool_name: Optional[str] = None
+    tool_input: Optional[Dict] = None
+    duration: float = 0.0
+
+
+class FastPathRouter:
+    """
+    Answers trivial inputs without a model call: greetings, pure arithmetic
+    ("2+2", "what is 3*(4-1)?") and "capital/currency of X" questions the
+    bundled country index can resolve exactly. Anything else, including
+    expressions the calculator rejects and dates or phone numbers that
+    merely look like arithmetic, is left to the LLM.
+    Hit and miss counts are kept per route for hit-rate monitoring.
+    """
+
+    def __init__(self, arithmetic_tool: ArithmeticTool, vacation_tool: VacationTool):
+        self.arithmetic_tool = arithmetic_tool
+        self.vacation_tool = vacation_tool
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def route(self, text: str) -> Optional[FastPathAnswer]:
+        """Return the answer for inputs served directly, with the tool it stands in for, or None."""
+        text = ' '.join(text.split())
+        for route, handler in (("greeting", self.greeting),
+                               ("arithmetic", self.arithmetic),
+                               ("country", self.country)):
+            start = time.perf_counter()
+            answer = handler(text)
+            if answer is not None:
+                self._count(route)
+                return FastPathAnswer(route, answer, ROUTE_TOOLS.get(route), self.tool_input(route, text),
+                                      time.perf_counter() - start)
+        self._count("miss")
+        return None
+
+    @staticmethod
+    def tool_input(route: str, text: str) -> Optional[Dict]:
+        """The arguments the routed tool would have been called with."""
+        if route == "arithmetic":
+            return {"expression": FastPathRouter.expression(text)}
+        if route == "country":
+            return {"location": COUNTRY_QUESTION.match(text).group('country')}
+        return None
+
+    def _count(self, key: str):
+        with self._lock:
+            self._counts[key] += 1
+
+    @staticmethod
+    def greeting(text: str) -> Optional[str]:
+        return GREETING_RESPONSE if GREETING_PATTERN.match(text) else None
+
+    @staticmethod
+    def expression(text: str) -> str:
+        expression = ARITHMETIC_PREFIX.sub('', text).rstrip('?= ')
+        return expression.replace('^', '**').replace('×', '*').replace('÷', '/')
+
+    def arithmetic(self, text: str) -> Optional[str]:
+        expression = self.expression(text)
+        if not ARITHMETIC_PATTERN.match(expression) or not HAS_OPERATOR.search(expression):
+            return None
+        if NOT_ARITHMETIC_PATTERN.match(expression):
+            return None
+        if isinstance(self.arithmetic_tool.parse_mathematical_expression(expression), str):
+            # Let the model explain errors such as division by zero
+            return None
+        return self.arithmetic_tool.evaluate_expression(expression)
+
+    def country(self, text: str) -> Optional[str]:
+        match = COUNTRY_QUESTION.match(text)
+        if not match or not self.vacation_tool.use_offline_index:
+            return None
+        # Exact matches only: a fuzzy guess is better left to the model
+        country = load_country_index().lookup(match.group('country'), fuzzy=False)
+        if country is None:
+            return None
+
+        field = match.group('field').lower()
+        if field == 'capital':
+            value = ', '.join(country.get('capital', []))
+        else:
+            currencies = country.get('currencies', {})
+            value = self.vacation_tool.format_currency_information(currencies) if currencies else ''
+        if not value:
+            return None
+
+        name = country.get('name', {}).get('common', match.group('country'))
+        if name.startswith('United ') or name.endswith(('Islands', 'Republic', 'Netherlands')):
+            name = f"the {name}"
+        return f"The {field} of {name} is {value.rstrip('.')}."
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counts = dict(self._counts)
+        misses = counts.pop("miss", 0)
+        hits = sum(counts.values())
+        total = hits + misses
+        return {
+            "hits": counts,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+        }
@@ -1,6 +1,16 @@
-from typing import Any, Dict, List, Type
-from langchain.tools import BaseTool
+from typing import Any, ClassVar, Dict, Hashable, List, Optional, Type
+from langchain_core.tools import BaseTool
 from pydantic import BaseModel, Field
+from requests.adapters import HTTPAdapter
+from urllib.parse import quote
+from tools.country_index import load_country_index
+from utils.cache import AsyncSingleFlight, SingleFlight, TTLCache
+from utils.metrics import metrics
+import asyncio
+import os
+import threading
+import weakref
+import httpx
 import requests
 
 class VacationInput(BaseModel):
@@ -12,19 +22,150 @@ class VacationTool(BaseTool):
     description: str = "Gets country information including currency, capital, and region using REST Countries API. Requires a country name."
     args_schema: Type[BaseModel] = VacationInput
 
-    def fetch_country_data(self, country_name: str) -> Dict:
-        api_url = f"https://restcountries.com/v3.1/name/{country_name}?fields=name,capital,currencies,region"
-        response = requests.get(api_url)
+    base_url: str = Field(default_factory=lambda: os.getenv('REST_COUNTRIES_URL', 'https://restcountries.com/v3.1'))
+    timeout: float = 10.0
+    cache_ttl: float = 24 * 60 * 60
+    negative_cache_ttl: float = 10 * 60
+    # Answer from the bundled country snapshot first and only fall back to the API
+    # for names it does not know (or never, in offline_only mode)
+    use_offline_index: bool = Field(default_factory=lambda: os.getenv('VACATION_OFFLINE_INDEX', 'true').lower() != 'false')
+    offline_only: bool = Field(default_factory=lambda: os.getenv('VACATION_OFFLINE_ONLY', 'false').lower() == 'true')
+
+    # Connection pools, cache and in-flight requests are shared by every instance
+    _session: ClassVar[Optional[requests.Session]] = None
+    _session_lock: ClassVar[threading.Lock] = threading.Lock()
+    # httpx async clients are tied to the event loop that created them
+    _async_clients: ClassVar[weakref.WeakKeyDictionary] = weakref.WeakKeyDictionary()
+    _cache: ClassVar[TTLCache] = TTLCache(maxsize=512)
+    _inflight: ClassVar[SingleFlight] = SingleFlight()
+    _async_inflight: ClassVar[AsyncSingleFlight] = AsyncSingleFlight()
+
+    def model_post_init(self, __context: Any) -> None:
+        super().model_post_init(__context)
+        if self.offline_only:
+            self.use_offline_index = True
+        if self.use_offline_index:
+            # Load the snapshot at startup rather than on the first lookup
+            load_country_index()
+
+    def lookup_offline(self, country_name: str) -> Optional[Dict]:
+        if not self.use_offline_index:
+            return None
+        country = load_country_index().lookup(country_name)
+        if country is None and self.offline_only:
+            return {"error": f"No country found with name: {country_name}"}
+        return country
+
+    @staticmethod
+    def normalize_country_name(country_name: str) -> str:
+        return ' '.join(country_name.split()).casefold()
+
+    def cache_key(self, country_name: str) -> Hashable:
+        return (self.base_url, self.normalize_country_name(country_name))
 
-        if response.status_code != 200:
-            return {"error": f"Failed to get country info: {response.status_code}"}
+    def country_url(self, country_name: str) -> str:
+        return f"{self.base_url}/name/{quote(country_name.strip())}?fields=name,capital,currencies,region"
+
+    def parse_country_response(self, status_code: int, data: Any, country_name: str) -> Dict:
+        if status_code != 200:
+            return {"error": f"Failed to get country info: {status_code}"}
 
-        data = response.json()
         if not data or len(data) == 0:
             return {"error": f"No country found with name: {country_name}"}
 
         return data[0]
 
+    def remember(self, key: Hashable, result: Dict, status_code: int):
+        if "error" not in result:
+            self._cache.set(key, result, ttl=self.cache_ttl)
+        elif status_code in (200, 404):
+            # Unknown countries are cached briefly; server errors are retried
+            self._cache.set(key, result, ttl=self.negative_cache_ttl)
+
+    @classmethod
+    def get_session(cls) -> requests.Session:
+        if cls._session is None:
+            with cls._session_lock:
+                if cls._session is None:
+                    session = requests.Session()
+                    session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=32))
+                    session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=32))
+                    cls._session = session
+        return cls._session
+
+    @metrics.timed("country_lookup")
+    def fetch_country_data(self, country_name: str) -> Dict:
+        offline = self.lookup_offline(country_name)
+        if offline is not None:
+            metrics.increment("country_lookups_total", source="offline")
+            return offline
+
+        key = self.cache_key(country_name)
+        cached = self._cache.get(key)
+        if cached is not None:
+            metrics.increment("country_lookups_total", source="cache")
+            return cached
+        metrics.increment("country_lookups_total", source="api")
+        # Concurrent lookups for the same country share one request
+        return self._inflight.do(key, lambda: self._fetch_uncached(key, country_name))
+
+    def _fetch_uncached(self, key: Hashable, country_name: str) -> Dict:
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        try:
+            response = self.get_session().get(self.country_url(country_name), timeout=self.timeout)
+        except requests.RequestException as e:
+            return {"error": f"Failed to get country info: {e}"}
+
+        data = response.json() if response.status_code == 200 else None
+        result = self.parse_country_response(response.status_code, data, country_name)
+        self.remember(key, result, response.status_code)
+        return result
+
+    @classmethod
+    def get_async_client(cls) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = cls._async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(limits=httpx.Limits(max_connections=32, max_keepalive_connections=8))
+            cls._async_clients[loop] = client
+        return client
+
+    @classmethod
+    async def aclose_async_client(cls):
+        """Close the running event loop's httpx client, if one was opened; call before the loop ends."""
+        client = cls._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    @metrics.timed("country_lookup")
+    async def afetch_country_data(self, country_name: str) -> Dict:
+        offline = self.lookup_offline(country_name)
+        if offline is not None:
+            metrics.increment("country_lookups_total", source="offline")
+            return offline
+
+        key = self.cache_key(country_name)
+        cached = self._cache.get(key)
+        if cached is not None:
+            metrics.increment("country_lookups_total", source="cache")
+            return cached
+        metrics.increment("country_lookups_total", source="api")
+        return await self._async_inflight.do(key, lambda: self._afetch_uncached(key, country_name))
+
+    async def _afetch_uncached(self, key: Hashable, country_name: str) -> Dict:
+        try:
+            response = await self.get_async_client().get(self.country_url(country_name), timeout=self.timeout)
+        except httpx.HTTPError as e:
+            return {"error": f"Failed to get country info: {e}"}
+
+        data = response.json() if response.status_code == 200 else None
+        result = self.parse_country_response(response.status_code, data, country_name)
+        self.remember(key, result, response.status_code)
+        return result
+
     def _run(self, **kwargs) -> str:
         location = kwargs.get('location')
         user_id = kwargs.get('user_id', 'default_user')
@@ -33,7 +174,9 @@ class VacationTool(BaseTool):
             return "Please provide a country name."
 
         country_data = self.fetch_country_data(location)
+        return self.build_response(country_data, user_id)
 
+    def build_response(self, country_data: Dict, user_id: str) -> str:
         if "error" in country_data:
             return f"Error fetching country information: {country_data['error']}"
 
@@ -76,4 +219,11 @@ class VacationTool(BaseTool):
         return response
 
     async def _arun(self, **kwargs) -> str:
-        return self._run(**kwargs)
\ No newline at end of file
+        location = kwargs.get('location')
+        user_id = kwargs.get('user_id', 'default_user')
+
+        if not location:
+            return "Please provide a country name."
+
+        country_data = await self.afetch_country_data(location)
+        return self.build_response(country_data, user_id)
\ No newline at end of file
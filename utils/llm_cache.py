@@ -0,0 +1,261 @@
+from typing import Any, Dict, Optional, Sequence
+from uuid import uuid4
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage, message_to_dict, messages_from_dict
+
+from utils.cache import TTLCache
+
+
+class InMemoryLLMCacheBackend:
+    """Process-local LRU store of serialized responses."""
+
+    blocking = False
+
+    def __init__(self, maxsize: int = 1024):
+        self._cache = TTLCache(maxsize=maxsize)
+
+    def get(self, key: str) -> Optional[str]:
+        return self._cache.get(key)
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        self._cache.set(key, value, ttl=ttl)
+
+    def clear(self):
+        self._cache.clear()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def close(self):
+        pass
+
+
+class SQLiteLLMCacheBackend:
+    """
+    On-disk store shared by every process pointing at the same file. Rows
+    carry a wall-clock expiry; once the table outgrows maxsize the least
+    recently read rows are pruned.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str = "llm_cache.sqlite", maxsize: int = 10000, prune_interval: int = 100):
+        self.path = path
+        self.maxsize = maxsize
+        self.prune_interval = prune_interval
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA busy_timeout=5000")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL,
+                    accessed_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS llm_cache_accessed_at ON llm_cache (accessed_at);
+            """)
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            return value
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now + ttl if ttl is not None else None, now),
+            )
+            self._writes += 1
+            if self._writes % self.prune_interval == 0:
+                self._prune(now)
+
+    def _prune(self, now: float):
+        self._conn.execute("DELETE FROM llm_cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        self._conn.execute(
+            "DELETE FROM llm_cache WHERE key IN ("
+            "SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.maxsize,),
+        )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _normalize_content(content: Any) -> Any:
+    if isinstance(content, str):
+        return ' '.join(content.split())
+    return content
+
+
+def normalize_messages(messages: Sequence[BaseMessage]) -> list:
+    """
+    Reduce a prompt to what the model actually sees. Message ids are dropped,
+    whitespace is collapsed and tool call ids are replaced by their position,
+    so the same conversation from another thread maps to the same key.
+    """
+    call_ids: Dict[str, int] = {}
+    normalized = []
+    for message in messages:
+        entry = {"type": message.type, "content": _normalize_content(message.content)}
+        if message.name:
+            entry["name"] = message.name
+        if isinstance(message, AIMessage) and message.tool_calls:
+            entry["tool_calls"] = [
+                [call["name"], call["args"], call_ids.setdefault(call["id"], len(call_ids))]
+                for call in message.tool_calls
+            ]
+        if isinstance(message, ToolMessage):
+            entry["tool_call_id"] = call_ids.setdefault(message.tool_call_id, len(call_ids))
+        normalized.append(entry)
+    return normalized
+
+
+class LLMResponseCache:
+    """
+    Caches chat model responses keyed on the normalized prompt, the model
+    name and sampling parameters, and the schemas of the bound tools.
+    Only calls at or below max_temperature are cached, since sampling at a
+    higher temperature is meant to vary. Hits return a copy with fresh
+    message and tool call ids so a cached reply can be added to any thread.
+    """
+
+    def __init__(self, backend=None, ttl: Optional[float] = 24 * 60 * 60, max_temperature: float = 0.0):
+        self.backend = backend if backend is not None else InMemoryLLMCacheBackend()
+        self.ttl = ttl
+        self.max_temperature = max_temperature
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.errors = 0
+        self._tool_digests: Dict[tuple, str] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def allows(self, llm) -> bool:
+        temperature = getattr(llm, 'temperature', None)
+        return temperature is not None and temperature <= self.max_temperature
+
+    def _tool_digest(self, tools: Sequence) -> str:
+        signature = tuple(id(tool) for tool in tools)
+        digest = self._tool_digests.get(signature)
+        if digest is None:
+            # Imported on first use, it pulls in pydantic schema generation
+            from langchain_core.utils.function_calling import convert_to_openai_tool
+            schemas = json.dumps([convert_to_openai_tool(tool) for tool in tools], sort_keys=True, default=str)
+            digest = hashlib.sha256(schemas.encode()).hexdigest()
+            self._tool_digests[signature] = digest
+        return digest
+
+    def key_for(self, llm, messages: Sequence[BaseMessage], tools: Sequence = ()) -> Optional[str]:
+        """Cache key for this call, or None when the caching policy excludes it."""
+        if not self.allows(llm):
+            self._count("skipped")
+            return None
+        payload = {
+            "model": getattr(llm, 'model_name', None) or getattr(llm, 'model', None),
+            "temperature": llm.temperature,
+            "top_p": getattr(llm, 'top_p', None),
+            "max_tokens": getattr(llm, 'max_tokens', None),
+            "tools": self._tool_digest(tools),
+            "messages": normalize_messages(messages),
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    @staticmethod
+    def _serialize(message: AIMessage) -> str:
+        data = message_to_dict(message)
+        data["data"]["id"] = None
+        # Tool calls are restored from the parsed form with new ids
+        data["data"].get("additional_kwargs", {}).pop("tool_calls", None)
+        return json.dumps(data)
+
+    @staticmethod
+    def _deserialize(value: str) -> AIMessage:
+        message = messages_from_dict([json.loads(value)])[0]
+        for call in message.tool_calls:
+            call["id"] = f"call_{uuid4().hex[:24]}"
+        message.response_metadata = {**message.response_metadata, "cache_hit": True}
+        return message
+
+    def get(self, key: str) -> Optional[AIMessage]:
+        try:
+            value = self.backend.get(key)
+        except sqlite3.Error as e:
+            self._count("errors")
+            print(f"Warning: LLM cache lookup failed: {e}")
+            value = None
+        if value is None:
+            self._count("misses")
+            return None
+        self._count("hits")
+        return self._deserialize(value)
+
+    def set(self, key: str, message: AIMessage):
+        try:
+            self.backend.set(key, self._serialize(message), ttl=self.ttl)
+        except sqlite3.Error as e:
+            self._count("errors")
+            print(f"Warning: LLM cache store failed: {e}")
+
+    async def aget(self, key: str) -> Optional[AIMessage]:
+        if self.backend.blocking:
+            return await asyncio.to_thread(self.get, key)
+        return self.get(key)
+
+    async def aset(self, key: str, message: AIMessage):
+        if self.backend.blocking:
+            await asyncio.to_thread(self.set, key, message)
+        else:
+            self.set(key, message)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self.backend),
+        }
+
+    def clear(self):
+        self.backend.clear()
+
+    def close(self):
+        self.backend.close()